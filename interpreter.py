@@ -1,8 +1,29 @@
 from typing import Any, Dict, List, Optional
 import os
 import sys
+import time
+import math
+import decimal
+import copy
+import pickle
+import sqlite3
+import hashlib
+import operator
+import functools
+import itertools
+import array
+import heapq
+import bisect
+import struct
+import weakref
+from collections import OrderedDict, deque
 from typing import Dict, List, Any, Optional, Callable
 
+try:
+    import numpy
+except ImportError:  # NumArray falls back to array.array storage
+    numpy = None
+
 from lexer import Lexer
 from parser import (Program, FunctionDef, Statement, Expression, ExpressionStatement,
                     ReturnStatement, IfStatement, WhileStatement, ForStatement,
@@ -10,7 +31,11 @@ from parser import (Program, FunctionDef, Statement, Expression, ExpressionState
                     Identifier, Literal, ArrayExpression, DictExpression, IndexExpression,
                     BreakStatement, ContinueStatement, ImportStatement, Parser,
                     SwitchStatement, CaseStatement, TupleExpression, TryStatement,
-                    ThrowStatement, LambdaExpression, MultiAssignmentExpression)
+                    ThrowStatement, LambdaExpression, MultiAssignmentExpression,
+                    FormatStringExpression, FormatField, compile_format_string,
+                    iter_child_nodes, ast_fingerprint, YieldStatement, contains_yield,
+                    ComprehensionExpression, SliceExpression, AugmentedAssignment, RecordDef,
+                    FieldExpression)
 
 class VanctionRuntimeError(Exception):
     def __init__(self, message: str, file: str = "", line: int = 0, column: int = 0):
@@ -97,6 +122,1602 @@ class AnytionType:
     def __repr__(self):
         return "<anytion>"
 
+DEFAULT_MEMO_SIZE = 1024
+
+_MISSING = object()
+
+class MemoCache:
+    """Bounded LRU cache of call results keyed by argument tuples"""
+    __slots__ = ('maxsize', 'entries', 'hits', 'misses', 'evictions')
+    
+    def __init__(self, maxsize: int = DEFAULT_MEMO_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def call(self, function: Callable, arguments: tuple) -> Any:
+        """Return the cached result for arguments, calling function on a miss"""
+        try:
+            result = self.entries.get(arguments, _MISSING)
+        except TypeError:
+            # Unhashable arguments (arrays, dictionaries) bypass the cache
+            return function()
+        if result is not _MISSING:
+            self.hits += 1
+            self.entries.move_to_end(arguments)
+            return result
+        
+        self.misses += 1
+        result = function()
+        self.entries[arguments] = result
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return result
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+        }
+    
+    def clear(self):
+        self.entries.clear()
+
+class MemoizedFunction:
+    """Callable wrapper that memoizes a lambda or built-in function"""
+    __slots__ = ('function', 'cache')
+    
+    def __init__(self, function: Callable, cache: MemoCache):
+        self.function = function
+        self.cache = cache
+    
+    def __call__(self, *args):
+        return self.cache.call(lambda: self.function(*args), args)
+    
+    def __repr__(self):
+        return "<memoized function>"
+
+DEFAULT_PERSISTENT_CACHE_BYTES = 256 * 1024 * 1024
+
+class PersistentStore:
+    """On-disk result store shared by persistent functions, safe across concurrent processes
+    
+    Entries live in an SQLite database in WAL mode; writers take an immediate transaction
+    so concurrent runs serialize their updates. Once the stored values exceed max_bytes the
+    least recently used entries are evicted.
+    """
+    
+    def __init__(self, path: str, max_bytes: int = DEFAULT_PERSISTENT_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, function TEXT NOT NULL, value BLOB NOT NULL, "
+            "size INTEGER NOT NULL, accessed REAL NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+    
+    def get(self, key: str) -> Any:
+        """Return the stored value for key, or _MISSING"""
+        row = self.connection.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return _MISSING
+        try:
+            self.connection.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.OperationalError:
+            pass  # Another process holds the write lock; the access time is only a hint
+        return pickle.loads(row[0])
+    
+    def put(self, key: str, function: str, blob: bytes) -> int:
+        """Store a pickled value and return the number of entries evicted"""
+        connection = self.connection
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("INSERT OR REPLACE INTO entries (key, function, value, size, accessed) VALUES (?, ?, ?, ?, ?)",
+                               (key, function, blob, len(blob), time.time()))
+            evicted = 0
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                for old_key, size in connection.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    connection.execute("DELETE FROM entries WHERE key = ?", (old_key,))
+                    total -= size
+                    evicted += 1
+            connection.execute("COMMIT")
+            return evicted
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+    
+    def count(self, function: str) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM entries WHERE function = ?", (function,)).fetchone()[0]
+    
+    def clear(self, function: str):
+        self.connection.execute("DELETE FROM entries WHERE function = ?", (function,))
+
+class PersistentFunction:
+    """Callable wrapper that reuses results stored on disk by previous runs"""
+    __slots__ = ('function', 'store', 'identity', 'hits', 'misses', 'evictions')
+    
+    def __init__(self, function: Callable, store: PersistentStore, identity: str):
+        self.function = function
+        self.store = store
+        self.identity = identity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __call__(self, *args):
+        try:
+            key = hashlib.sha256(self.identity.encode('utf-8') + pickle.dumps(args, protocol=4)).hexdigest()
+            result = self.store.get(key)
+        except (pickle.PicklingError, TypeError, AttributeError, sqlite3.Error):
+            # Arguments that cannot be serialized (or an unreadable store) bypass the cache
+            return self.function(*args)
+        if result is not _MISSING:
+            self.hits += 1
+            return result
+        
+        self.misses += 1
+        result = self.function(*args)
+        try:
+            self.evictions += self.store.put(key, self.identity, pickle.dumps(result, protocol=4))
+        except (pickle.PicklingError, TypeError, AttributeError, sqlite3.Error):
+            pass  # Results that cannot be stored are simply not cached
+        return result
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': self.store.count(self.identity),
+            'maxbytes': self.store.max_bytes,
+        }
+    
+    def clear(self):
+        self.store.clear(self.identity)
+    
+    def __repr__(self):
+        return "<persistent function>"
+
+class VanctionGenerator:
+    """Lazy iterator returned by calling a function whose body contains yield
+    
+    The suspended function frame is a Python generator, so a paused call costs one frame
+    and its local environment.
+    """
+    __slots__ = ('name', 'frames')
+    
+    def __init__(self, name: str, frames):
+        self.name = name
+        self.frames = frames
+    
+    def __iter__(self):
+        return self.frames
+    
+    def __next__(self):
+        return next(self.frames)
+    
+    def close(self):
+        self.frames.close()
+    
+    def __repr__(self):
+        return f"<generator {self.name}>"
+
+class Record:
+    """Base class of the types declared with record Name(field, ...)
+    
+    Each declaration creates a subclass whose fields are __slots__, so instances hold their
+    values inline instead of in a per-instance dictionary. Records are immutable, compare
+    and hash by type and field values, and can be used as dictionary keys.
+    """
+    __slots__ = ()
+    _fields: tuple = ()
+    
+    def __init__(self, *values):
+        for field, value in zip(self._fields, values):
+            object.__setattr__(self, field, value)
+    
+    def _values(self) -> tuple:
+        return tuple(getattr(self, field) for field in self._fields)
+    
+    def __setattr__(self, name: str, value: Any):
+        raise VanctionImmutableError(f"{type(self).__name__}.{name}")
+    
+    def __eq__(self, other):
+        return type(self) is type(other) and self._values() == other._values()
+    
+    def __hash__(self):
+        return hash((type(self).__name__, self._values()))
+    
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{field}={getattr(self, field)!r}' for field in self._fields)})"
+
+# Values usable as dictionary keys in literals and element assignments
+DICT_KEY_TYPES = (int, float, str, bool, type(None), Record)
+
+# Array builtins that change their first argument in place; a range passed to them becomes an array
+IN_PLACE_ARRAY_BUILTINS = frozenset(('array.append', 'array.insert', 'array.remove', 'array.pop',
+                                     'array.reverse', 'array.sort'))
+
+# Views that still read through to a list, by id of the list (see release_views)
+_LIVE_VIEWS: Dict[int, 'weakref.WeakValueDictionary'] = {}
+_live_views_limit = 1024  # Registry size at which entries whose views are all gone are dropped
+
+def track_view(view: 'ArrayView'):
+    """Register a view so that changing its base list in place copies the elements out first"""
+    global _live_views_limit
+    views = _LIVE_VIEWS.get(id(view.base))
+    if views is None:
+        if len(_LIVE_VIEWS) >= _live_views_limit:
+            for key in [key for key, views in _LIVE_VIEWS.items() if not views]:
+                del _LIVE_VIEWS[key]
+            _live_views_limit = max(1024, 2 * len(_LIVE_VIEWS))
+        views = _LIVE_VIEWS[id(view.base)] = weakref.WeakValueDictionary()
+    views[id(view)] = view
+
+def release_views(base: list):
+    """Give every live view of base its own copy of its elements before base is changed in place"""
+    views = _LIVE_VIEWS.pop(id(base), None)
+    if views:
+        for view in list(views.values()):
+            if view.base is base and not view.owned:
+                view.detach()
+
+class ArrayView:
+    """Slice of an array that shares the array's storage instead of copying it
+    
+    Reads go through to the underlying array while neither side changes. Writing to the
+    view first copies the selected elements into the view's own storage (copy-on-write), and
+    changing the array in place (an element store or a mutating array builtin) first copies
+    the elements out into every live view of it, so a view always behaves like a copy taken
+    when it was sliced.
+    """
+    __slots__ = ('base', 'indices', 'owned', '__weakref__')
+    
+    def __init__(self, base: list, indices: range):
+        self.base = base
+        self.indices = indices  # Positions in base selected by the view; None once owned
+        self.owned = False  # True once the view has copied its elements into its own storage
+        track_view(self)
+    
+    def slice(self, selection: slice) -> 'ArrayView':
+        """Slice the view again without copying (views of views share the same base)"""
+        if self.owned:
+            return ArrayView(self.base, range(len(self.base))[selection])
+        return ArrayView(self.base, self.indices[selection])
+    
+    def detach(self):
+        """Copy the viewed elements into private storage before either side is modified"""
+        self.base = [self.base[i] for i in self.indices]
+        self.indices = None
+        self.owned = True
+    
+    def own(self) -> list:
+        """The view's private storage, ready to be changed in place by an array builtin"""
+        if self.owned:
+            release_views(self.base)
+        else:
+            self.detach()
+        return self.base
+    
+    def __setitem__(self, index: int, value: Any):
+        self.own()[index] = value
+    
+    def __len__(self):
+        return len(self.base) if self.owned else len(self.indices)
+    
+    def __getitem__(self, index: int):
+        return self.base[index] if self.owned else self.base[self.indices[index]]
+    
+    def __iter__(self):
+        indices = self.indices
+        if indices is None:
+            return iter(self.base)
+        if indices.step == 1:
+            return itertools.islice(self.base, indices.start, indices.stop)
+        return map(self.base.__getitem__, indices)
+    
+    def __eq__(self, other):
+        if isinstance(other, (list, ArrayView)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+    
+    def __add__(self, other):
+        if isinstance(other, (list, ArrayView)):
+            return list(self) + list(other)
+        return NotImplemented
+    
+    def __radd__(self, other):
+        if isinstance(other, list):
+            return other + list(self)
+        return NotImplemented
+    
+    def __mul__(self, count):
+        if isinstance(count, int):
+            return list(self) * count
+        return NotImplemented
+    
+    __rmul__ = __mul__
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return repr(list(self))
+
+# NumArray element types: name -> (array.array typecode, NumPy dtype)
+NUMARRAY_DTYPES = {
+    'f64': ('d', 'float64'),
+    'f32': ('f', 'float32'),
+    'i64': ('q', 'int64'),
+    'i32': ('i', 'int32'),
+    'u8': ('B', 'uint8'),
+    'bool': ('B', 'bool'),
+}
+NUMPY_DTYPE_NAMES = {numpy_dtype: name for name, (_, numpy_dtype) in NUMARRAY_DTYPES.items()}
+FLOAT_DTYPES = frozenset(('f64', 'f32'))
+
+NUMARRAY_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '%': operator.mod,
+    '^': operator.pow,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+}
+COMPARISON_OPERATORS = frozenset(('==', '!=', '<', '>', '<=', '>='))
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+class NumArray:
+    """Fixed-type numeric array whose arithmetic and comparisons apply element-wise
+    
+    Values are stored unboxed: in a NumPy array when NumPy is installed, otherwise in an
+    array.array (or a memoryview over one). Slices share storage with the original array.
+    """
+    __slots__ = ('data', 'dtype')
+    
+    def __init__(self, data, dtype: str):
+        self.data = data
+        self.dtype = dtype
+    
+    @classmethod
+    def build(cls, values, dtype: str) -> 'NumArray':
+        """Create a NumArray from an iterable of Python numbers"""
+        typecode, numpy_dtype = NUMARRAY_DTYPES[dtype]
+        if numpy is not None:
+            data = numpy.array(values if isinstance(values, list) else list(values))
+            if data.size and dtype not in FLOAT_DTYPES:
+                # Reject what array.array would reject instead of letting astype wrap it around
+                if data.dtype.kind not in 'biu':
+                    raise TypeError(f"cannot store {data.dtype.name} values as {dtype}")
+                low, high = (0, 255) if dtype == 'bool' else (numpy.iinfo(numpy_dtype).min, numpy.iinfo(numpy_dtype).max)
+                if data.min() < low or data.max() > high:
+                    raise OverflowError(f"values out of range for {dtype}")
+            return cls(data.astype(numpy_dtype, copy=False), dtype)
+        return cls(array.array(typecode, values), dtype)
+    
+    def __len__(self):
+        return len(self.data)
+    
+    def __iter__(self):
+        if numpy is not None:
+            return iter(self.data.tolist())
+        if self.dtype == 'bool':
+            return map(bool, self.data)
+        return iter(self.data)
+    
+    def __getitem__(self, index: int):
+        value = self.data[index]
+        if numpy is not None:
+            return value.item()
+        return bool(value) if self.dtype == 'bool' else value
+    
+    def __setitem__(self, index: int, value: Any):
+        try:
+            self.data[index] = value
+        except (TypeError, ValueError, OverflowError):
+            raise VanctionTypeError(self.dtype, type_name(value))
+    
+    def __neg__(self):
+        return numarray_operation('-', 0, self)
+    
+    def slice(self, selection: slice) -> 'NumArray':
+        """Return a slice that shares this array's storage"""
+        if numpy is not None or isinstance(self.data, memoryview):
+            return NumArray(self.data[selection], self.dtype)
+        return NumArray(memoryview(self.data)[selection], self.dtype)
+    
+    def tolist(self) -> list:
+        return list(self)
+    
+    def __repr__(self):
+        return f"NumArray({self.tolist()}, {self.dtype})"
+
+def numarray_operation(op: str, left: Any, right: Any) -> NumArray:
+    """Apply a binary operator element-wise; one operand may be a scalar"""
+    function = NUMARRAY_OPERATORS.get(op)
+    if function is None:
+        raise VanctionRuntimeError(f"Operator {op} is not supported for NumArray")
+    if isinstance(left, NumArray) and isinstance(right, NumArray) and len(left) != len(right):
+        raise VanctionRuntimeError(f"NumArray length mismatch: {len(left)} and {len(right)}")
+    for operand in (left, right):
+        if not isinstance(operand, (NumArray, int, float)):
+            raise VanctionTypeError("NumArray or number", type_name(operand))
+    if op in ('/', '%'):
+        if not isinstance(right, NumArray):
+            has_zero = right == 0
+        elif numpy is not None:
+            has_zero = bool((right.data == 0).any())
+        else:
+            has_zero = any(value == 0 for value in right.data)
+        if has_zero:
+            raise VanctionDivisionByZeroError()
+    
+    try:
+        if numpy is not None:
+            return _numpy_operation(op, function, left, right)
+        values = list(map(function,
+                          left.data if isinstance(left, NumArray) else itertools.repeat(left),
+                          right.data if isinstance(right, NumArray) else itertools.repeat(right)))
+        return NumArray.build(values, _result_dtype(op, left, right, values))
+    except OverflowError:
+        raise VanctionRuntimeError(f"NumArray {op}: integer result does not fit i64")
+
+def _numpy_operation(op: str, function: Callable, left: Any, right: Any) -> NumArray:
+    """numarray_operation on NumPy arrays, widened the way the array.array fallback does it
+    
+    Integer operands are computed as int64 and floats as float64, so a u8 array plus 10 gives
+    260 rather than a wrapped 4, and an integer result outside int64 raises OverflowError
+    instead of wrapping around.
+    """
+    floating = op == '/' or any(isinstance(operand, float) or
+                                (isinstance(operand, NumArray) and operand.dtype in FLOAT_DTYPES)
+                                for operand in (left, right))
+    if op == '^' and not floating:
+        # A negative integer exponent gives a float, as in Python
+        floating = bool((right.data < 0).any()) if isinstance(right, NumArray) else right < 0
+    work_dtype = 'float64' if floating else 'int64'
+    operands = [operand.data.astype(work_dtype, copy=False) if isinstance(operand, NumArray) else operand
+                for operand in (left, right)]
+    with numpy.errstate(all='ignore'):
+        result = function(*operands)
+    if op in COMPARISON_OPERATORS:
+        return NumArray(result, 'bool')
+    if floating:
+        return NumArray(result, 'f64')
+    if op != '%' and result.size:
+        # int64 arithmetic wraps silently: estimate in floats, and check exactly near the limit
+        estimate = function(*(operand.astype('float64') if isinstance(operand, numpy.ndarray) else operand
+                              for operand in operands))
+        if not numpy.abs(estimate).max() < 2.0 ** 62:
+            exact = function(*(operand.astype(object) if isinstance(operand, numpy.ndarray) else operand
+                               for operand in operands))
+            if any(not INT64_MIN <= value <= INT64_MAX for value in exact):
+                raise OverflowError("integer result does not fit int64")
+    return NumArray(result, 'i64')
+
+def _result_dtype(op: str, left: Any, right: Any, values: list) -> str:
+    if op in COMPARISON_OPERATORS:
+        return 'bool'
+    if op == '/' or any(isinstance(value, float) for value in values):
+        return 'f64'
+    for operand in (left, right):
+        if isinstance(operand, NumArray) and operand.dtype in FLOAT_DTYPES:
+            return 'f64'
+    return 'i64'
+
+def numarray_where(condition: NumArray, when_true: Any, when_false: Any) -> NumArray:
+    """Pick when_true where condition holds and when_false elsewhere (either may be a scalar)"""
+    for operand in (when_true, when_false):
+        if isinstance(operand, NumArray) and len(operand) != len(condition):
+            raise VanctionRuntimeError(f"NumArray length mismatch: {len(condition)} and {len(operand)}")
+    if numpy is not None:
+        result = numpy.where(condition.data.astype(bool),
+                             when_true.data if isinstance(when_true, NumArray) else when_true,
+                             when_false.data if isinstance(when_false, NumArray) else when_false)
+        # Widen like the fallback: floats to f64, everything else to i64
+        dtype = 'f64' if result.dtype.kind == 'f' else 'i64'
+        return NumArray(result.astype(NUMARRAY_DTYPES[dtype][1], copy=False), dtype)
+    values = [t if c else f for c, t, f in zip(
+        condition.data,
+        when_true.data if isinstance(when_true, NumArray) else itertools.repeat(when_true),
+        when_false.data if isinstance(when_false, NumArray) else itertools.repeat(when_false))]
+    return NumArray.build(values, _result_dtype('?', when_true, when_false, values))
+
+def table_column(values: list):
+    """Store a column as a NumArray when all its values are numbers, otherwise as an array"""
+    kinds = set(map(type, values))
+    if not kinds or not kinds <= {bool, int, float}:
+        return values
+    if kinds == {bool}:
+        dtype = 'bool'
+    elif bool in kinds:
+        return values
+    else:
+        dtype = 'f64' if float in kinds else 'i64'
+    try:
+        return NumArray.build(values, dtype)
+    except (TypeError, ValueError, OverflowError):
+        return values
+
+def column_take(column, indices) -> Any:
+    """Gather the given row positions of a column into a new column of the same kind"""
+    if isinstance(column, NumArray):
+        if numpy is not None:
+            return NumArray(column.data[numpy.asarray(indices, dtype=numpy.intp)], column.dtype)
+        return NumArray(array.array(NUMARRAY_DTYPES[column.dtype][0], map(column.data.__getitem__, indices)),
+                        column.dtype)
+    return list(map(column.__getitem__, indices))
+
+def column_values(column) -> list:
+    """Return a column's values as a Python list (shared, not copied, for array columns)"""
+    return column.tolist() if isinstance(column, NumArray) else column
+
+class Table:
+    """Column-oriented table of rows
+    
+    Each column is a NumArray when its values are all numbers and a plain array otherwise.
+    Operations run column-at-a-time and return new tables; columns a result does not
+    change are shared with the source table rather than copied.
+    """
+    __slots__ = ('columns', 'length')
+    
+    def __init__(self, columns: Dict[str, Any], length: int):
+        self.columns = columns
+        self.length = length
+    
+    def take(self, indices) -> 'Table':
+        """Return a table holding the given row positions, in that order"""
+        if not isinstance(indices, (list, range)):
+            indices = list(indices)
+        return Table({name: column_take(column, indices) for name, column in self.columns.items()}, len(indices))
+    
+    def __len__(self):
+        return self.length
+    
+    def __iter__(self):
+        names = list(self.columns)
+        for values in zip(*map(column_values, self.columns.values())):
+            yield dict(zip(names, values))
+    
+    def __repr__(self):
+        return f"Table({self.length} rows; columns: {', '.join(self.columns)})"
+
+class TableGroups:
+    """Rows of a table grouped by key columns, waiting to be aggregated by Table.agg
+    
+    ids holds each row's group number; keys holds each group's key (a tuple when grouping
+    by several columns) in order of first appearance.
+    """
+    __slots__ = ('table', 'names', 'keys', 'ids')
+    
+    def __init__(self, table: Table, names: List[str], keys: list, ids: list):
+        self.table = table
+        self.names = names
+        self.keys = keys
+        self.ids = ids
+    
+    def __repr__(self):
+        return f"TableGroups({len(self.keys)} groups by {', '.join(self.names)})"
+
+def _bucket_values(values: list, ids: list, count: int) -> List[list]:
+    buckets = [[] for _ in range(count)]
+    appenders = [bucket.append for bucket in buckets]
+    for group, value in zip(ids, values):
+        appenders[group](value)
+    return buckets
+
+# Table.agg aggregations: name -> function of a non-empty list of values
+TABLE_AGGREGATES = {
+    'sum': sum,
+    'mean': lambda values: sum(values) / len(values),
+    'min': min,
+    'max': max,
+    'count': len,
+    'first': operator.itemgetter(0),
+    'last': operator.itemgetter(-1),
+}
+
+def table_aggregate(kind: str, column, groups: TableGroups) -> Any:
+    """Aggregate one column per group; sums, means and counts are vectorized under NumPy"""
+    count = len(groups.keys)
+    if numpy is not None and kind in ('sum', 'mean', 'count'):
+        ids = numpy.asarray(groups.ids, dtype=numpy.intp)
+        sizes = numpy.bincount(ids, minlength=count)
+        if kind == 'count':
+            return NumArray(sizes.astype('int64'), 'i64')
+        if isinstance(column, NumArray):
+            totals = numpy.zeros(count, dtype='float64' if column.dtype in FLOAT_DTYPES else 'int64')
+            numpy.add.at(totals, ids, column.data)
+            if kind == 'sum':
+                return NumArray(totals, NUMPY_DTYPE_NAMES[totals.dtype.name])
+            return NumArray(totals / sizes, 'f64')
+    buckets = _bucket_values(column_values(column), groups.ids, count)
+    return table_column(list(map(TABLE_AGGREGATES[kind], buckets)))
+
+class Heap:
+    """Binary min-heap; with a key function, items are ordered by key(item)
+    
+    Entries are stored as (key, sequence, item) so that equal keys come out in insertion
+    order and the items themselves are never compared.
+    """
+    __slots__ = ('entries', 'key', 'counter')
+    
+    def __init__(self, items, key: Optional[Callable] = None):
+        self.key = key
+        self.counter = itertools.count()
+        self.entries = [self.entry(item) for item in items]
+        heapq.heapify(self.entries)
+    
+    def entry(self, item: Any) -> tuple:
+        return (item if self.key is None else self.key(item), next(self.counter), item)
+    
+    def push(self, item: Any):
+        heapq.heappush(self.entries, self.entry(item))
+    
+    def pop(self) -> Any:
+        return heapq.heappop(self.entries)[2]
+    
+    def peek(self) -> Any:
+        return self.entries[0][2]
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __iter__(self):
+        # Priority order, without consuming the heap
+        return map(operator.itemgetter(2), sorted(self.entries))
+    
+    def __contains__(self, item: Any):
+        return any(entry[2] == item for entry in self.entries)
+    
+    def __repr__(self):
+        return f"Heap({list(self)})"
+
+class SortedMap:
+    """Dictionary whose keys are kept in sorted order
+    
+    Lookups go through a hash map; ordered queries (first, last, floor, ceiling, range)
+    binary-search the sorted key list.
+    """
+    __slots__ = ('mapping', 'ordered')
+    
+    def __init__(self, items=()):
+        self.mapping = dict(items)
+        self.ordered = sorted(self.mapping)
+    
+    def __setitem__(self, key: Any, value: Any):
+        if key not in self.mapping:
+            try:
+                bisect.insort(self.ordered, key)
+            except TypeError:
+                raise VanctionRuntimeError(f"SortedMap key {key!r} cannot be compared with the existing keys")
+        self.mapping[key] = value
+    
+    def __getitem__(self, key: Any):
+        return self.mapping[key]
+    
+    def __delitem__(self, key: Any):
+        del self.mapping[key]
+        del self.ordered[bisect.bisect_left(self.ordered, key)]
+    
+    def __contains__(self, key: Any):
+        return key in self.mapping
+    
+    def __len__(self):
+        return len(self.mapping)
+    
+    def __iter__(self):
+        return iter(self.ordered)
+    
+    def items(self):
+        return zip(self.ordered, map(self.mapping.__getitem__, self.ordered))
+    
+    def floor(self, key: Any) -> Any:
+        """Greatest key <= key, or unassigned"""
+        position = bisect.bisect_right(self.ordered, key)
+        return self.ordered[position - 1] if position else None
+    
+    def ceiling(self, key: Any) -> Any:
+        """Smallest key >= key, or unassigned"""
+        position = bisect.bisect_left(self.ordered, key)
+        return self.ordered[position] if position < len(self.ordered) else None
+    
+    def range(self, low: Any, high: Any) -> list:
+        """Keys k with low <= k < high, in order"""
+        return self.ordered[bisect.bisect_left(self.ordered, low):bisect.bisect_left(self.ordered, high)]
+    
+    def __repr__(self):
+        return "SortedMap({" + ", ".join(f"{key!r}: {value!r}" for key, value in self.items()) + "})"
+
+class PVector:
+    """Persistent vector: a 32-way trie of leaves plus a tail leaf, as in Clojure
+    
+    Updates never modify a vector; with() and push() copy only the nodes on the path to
+    the changed element (O(log32 n)) and share everything else with the original.
+    """
+    __slots__ = ('count', 'shift', 'root', 'tail')
+    
+    def __init__(self, count: int = 0, shift: int = 5, root: list = None, tail: list = None):
+        self.count = count
+        self.shift = shift
+        self.root = [] if root is None else root
+        self.tail = [] if tail is None else tail
+    
+    @classmethod
+    def build(cls, items: list) -> 'PVector':
+        """Build a vector from a list bottom-up, without intermediate versions"""
+        count = len(items)
+        tail_offset = 0 if count < 32 else ((count - 1) >> 5) << 5
+        nodes = [items[start:start + 32] for start in range(0, tail_offset, 32)]
+        shift = 5
+        while len(nodes) > 32:
+            nodes = [nodes[start:start + 32] for start in range(0, len(nodes), 32)]
+            shift += 5
+        return cls(count, shift, nodes, items[tail_offset:])
+    
+    def tail_offset(self) -> int:
+        return 0 if self.count < 32 else ((self.count - 1) >> 5) << 5
+    
+    def leaf_for(self, index: int) -> list:
+        if index >= self.tail_offset():
+            return self.tail
+        node = self.root
+        level = self.shift
+        while level > 0:
+            node = node[(index >> level) & 31]
+            level -= 5
+        return node
+    
+    def __getitem__(self, index: int) -> Any:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return self.leaf_for(index)[index & 31]
+    
+    def set(self, index: int, value: Any) -> 'PVector':
+        """New vector with the element at index replaced"""
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        if index >= self.tail_offset():
+            tail = list(self.tail)
+            tail[index & 31] = value
+            return PVector(self.count, self.shift, self.root, tail)
+        return PVector(self.count, self.shift, self._set_in(self.shift, self.root, index, value), self.tail)
+    
+    def _set_in(self, level: int, node: list, index: int, value: Any) -> list:
+        node = list(node)
+        if level == 0:
+            node[index & 31] = value
+        else:
+            slot = (index >> level) & 31
+            node[slot] = self._set_in(level - 5, node[slot], index, value)
+        return node
+    
+    def push(self, value: Any) -> 'PVector':
+        """New vector with value appended"""
+        if self.count - self.tail_offset() < 32:
+            return PVector(self.count + 1, self.shift, self.root, self.tail + [value])
+        # The tail is full: move it into the trie, growing a new root level when the trie is full
+        if (self.count >> 5) > (1 << self.shift):
+            root = [self.root, self._new_path(self.shift, self.tail)]
+            return PVector(self.count + 1, self.shift + 5, root, [value])
+        return PVector(self.count + 1, self.shift, self._push_tail(self.shift, self.root, self.tail), [value])
+    
+    def _push_tail(self, level: int, parent: list, tail: list) -> list:
+        slot = ((self.count - 1) >> level) & 31
+        node = list(parent)
+        if level == 5:
+            child = tail
+        elif slot < len(parent):
+            child = self._push_tail(level - 5, parent[slot], tail)
+        else:
+            child = self._new_path(level - 5, tail)
+        if slot < len(node):
+            node[slot] = child
+        else:
+            node.append(child)
+        return node
+    
+    @staticmethod
+    def _new_path(level: int, node: list) -> list:
+        while level > 0:
+            node = [node]
+            level -= 5
+        return node
+    
+    def __len__(self):
+        return self.count
+    
+    def __iter__(self):
+        for start in range(0, self.tail_offset(), 32):
+            yield from self.leaf_for(start)
+        yield from self.tail
+    
+    def __eq__(self, other):
+        return isinstance(other, PVector) and self.count == other.count and all(map(operator.eq, self, other))
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f"PVector({list(self)})"
+
+class _Collision:
+    """HAMT entry for several keys whose 32-bit hashes are equal"""
+    __slots__ = ('hash', 'pairs')
+    
+    def __init__(self, hash_value: int, pairs: tuple):
+        self.hash = hash_value
+        self.pairs = pairs
+
+class _HamtNode:
+    """Bitmap-indexed HAMT node: entries are (hash, key, value) leaves, nodes or collisions"""
+    __slots__ = ('bitmap', 'entries')
+    
+    def __init__(self, bitmap: int, entries: list):
+        self.bitmap = bitmap
+        self.entries = entries
+    
+    def find(self, key: Any, hash_value: int, shift: int) -> Any:
+        node = self
+        while True:
+            bit = 1 << ((hash_value >> shift) & 31)
+            if not node.bitmap & bit:
+                return _MISSING
+            entry = node.entries[(node.bitmap & (bit - 1)).bit_count()]
+            if isinstance(entry, _HamtNode):
+                node = entry
+                shift += 5
+            elif isinstance(entry, _Collision):
+                for pair_key, pair_value in entry.pairs:
+                    if pair_key == key:
+                        return pair_value
+                return _MISSING
+            else:
+                return entry[2] if entry[0] == hash_value and entry[1] == key else _MISSING
+    
+    def assoc(self, key: Any, hash_value: int, value: Any, shift: int):
+        """Return (new node, whether a key was added)"""
+        bit = 1 << ((hash_value >> shift) & 31)
+        position = (self.bitmap & (bit - 1)).bit_count()
+        entries = list(self.entries)
+        if not self.bitmap & bit:
+            entries.insert(position, (hash_value, key, value))
+            return _HamtNode(self.bitmap | bit, entries), True
+        entry = entries[position]
+        if isinstance(entry, _HamtNode):
+            entries[position], added = entry.assoc(key, hash_value, value, shift + 5)
+            return _HamtNode(self.bitmap, entries), added
+        if isinstance(entry, _Collision) and entry.hash == hash_value:
+            pairs = [pair for pair in entry.pairs if pair[0] != key]
+            added = len(pairs) == len(entry.pairs)
+            entries[position] = _Collision(hash_value, tuple(pairs) + ((key, value),))
+            return _HamtNode(self.bitmap, entries), added
+        if not isinstance(entry, _Collision) and entry[0] == hash_value:
+            if entry[1] == key:
+                entries[position] = (hash_value, key, value)
+                return _HamtNode(self.bitmap, entries), False
+            entries[position] = _Collision(hash_value, ((entry[1], entry[2]), (key, value)))
+            return _HamtNode(self.bitmap, entries), True
+        entries[position] = _hamt_merge(entry, (hash_value, key, value), hash_value, shift + 5)
+        return _HamtNode(self.bitmap, entries), True
+    
+    def dissoc(self, key: Any, hash_value: int, shift: int):
+        """Return the node without key (None when it becomes empty), or self if key is absent"""
+        bit = 1 << ((hash_value >> shift) & 31)
+        if not self.bitmap & bit:
+            return self
+        position = (self.bitmap & (bit - 1)).bit_count()
+        entry = self.entries[position]
+        if isinstance(entry, _HamtNode):
+            replacement = entry.dissoc(key, hash_value, shift + 5)
+            if replacement is entry:
+                return self
+        elif isinstance(entry, _Collision):
+            pairs = tuple(pair for pair in entry.pairs if pair[0] != key)
+            if len(pairs) == len(entry.pairs):
+                return self
+            replacement = (entry.hash, *pairs[0]) if len(pairs) == 1 else _Collision(entry.hash, pairs)
+        else:
+            if entry[0] != hash_value or entry[1] != key:
+                return self
+            replacement = None
+        entries = list(self.entries)
+        if replacement is None:
+            del entries[position]
+            return _HamtNode(self.bitmap & ~bit, entries) if entries else None
+        entries[position] = replacement
+        return _HamtNode(self.bitmap, entries)
+    
+    def items(self):
+        for entry in self.entries:
+            if isinstance(entry, _HamtNode):
+                yield from entry.items()
+            elif isinstance(entry, _Collision):
+                yield from entry.pairs
+            else:
+                yield entry[1], entry[2]
+
+def _hamt_merge(existing, leaf: tuple, hash_value: int, shift: int) -> _HamtNode:
+    """Build the node holding an existing entry and a new leaf whose hashes differ"""
+    existing_hash = existing.hash if isinstance(existing, _Collision) else existing[0]
+    existing_slot = (existing_hash >> shift) & 31
+    leaf_slot = (hash_value >> shift) & 31
+    if existing_slot == leaf_slot:
+        return _HamtNode(1 << existing_slot, [_hamt_merge(existing, leaf, hash_value, shift + 5)])
+    entries = [existing, leaf] if existing_slot < leaf_slot else [leaf, existing]
+    return _HamtNode((1 << existing_slot) | (1 << leaf_slot), entries)
+
+class PMap:
+    """Persistent hash map (hash array mapped trie)
+    
+    assoc() and dissoc() return new maps that copy only the O(log32 n) nodes on the path to
+    the changed key and share the rest with the original.
+    """
+    __slots__ = ('root', 'count')
+    
+    def __init__(self, root: _HamtNode = None, count: int = 0):
+        self.root = _HamtNode(0, []) if root is None else root
+        self.count = count
+    
+    @staticmethod
+    def hash_of(key: Any) -> int:
+        return hash(key) & 0xFFFFFFFF
+    
+    def get(self, key: Any, default: Any = None) -> Any:
+        value = self.root.find(key, self.hash_of(key), 0)
+        return default if value is _MISSING else value
+    
+    def assoc(self, key: Any, value: Any) -> 'PMap':
+        """New map with key set to value"""
+        root, added = self.root.assoc(key, self.hash_of(key), value, 0)
+        return PMap(root, self.count + added)
+    
+    def dissoc(self, key: Any) -> 'PMap':
+        """New map without key (the same map when key is absent)"""
+        root = self.root.dissoc(key, self.hash_of(key), 0)
+        if root is self.root:
+            return self
+        return PMap(root, self.count - 1)
+    
+    def __getitem__(self, key: Any) -> Any:
+        value = self.root.find(key, self.hash_of(key), 0)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+    
+    def __contains__(self, key: Any):
+        return self.root.find(key, self.hash_of(key), 0) is not _MISSING
+    
+    def __len__(self):
+        return self.count
+    
+    def items(self):
+        return self.root.items()
+    
+    def __iter__(self):
+        return (key for key, _ in self.root.items())
+    
+    def __eq__(self, other):
+        if not isinstance(other, PMap) or self.count != other.count:
+            return False
+        return all(other.root.find(key, self.hash_of(key), 0) == value for key, value in self.items())
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return "PMap({" + ", ".join(f"{key!r}: {value!r}" for key, value in self.items()) + "})"
+
+class BitSet:
+    """Fixed-size set of flags numbered 0..size-1
+    
+    Flags are stored one per byte (0 or 1) in a bytearray, so strided fills run as native
+    slice assignments. Bulk union, intersection and difference reinterpret the bytes as
+    one big integer and combine them with a single integer operation.
+    """
+    __slots__ = ('data',)
+    
+    def __init__(self, data: bytearray):
+        self.data = data
+    
+    @classmethod
+    def combine(cls, function: Callable, left: 'BitSet', right: 'BitSet') -> 'BitSet':
+        """Combine two bit sets flag-wise; the shorter one is padded with clear flags"""
+        size = max(len(left.data), len(right.data))
+        result = function(int.from_bytes(left.data, 'little'), int.from_bytes(right.data, 'little'))
+        return cls(bytearray(result.to_bytes(size, 'little')))
+    
+    def count(self) -> int:
+        return self.data.count(1)
+    
+    def __len__(self):
+        return len(self.data)
+    
+    def __getitem__(self, index: int) -> bool:
+        return self.data[index] == 1
+    
+    def __setitem__(self, index: int, value: Any):
+        if not isinstance(value, bool):
+            raise VanctionTypeError("bool", type_name(value))
+        self.data[index] = value
+    
+    def __contains__(self, index: Any):
+        return isinstance(index, int) and 0 <= index < len(self.data) and self.data[index] == 1
+    
+    def __iter__(self):
+        # Indices of the set flags
+        return itertools.compress(range(len(self.data)), self.data)
+    
+    def __eq__(self, other):
+        return isinstance(other, BitSet) and self.data == other.data
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f"BitSet({len(self.data)}, {list(self)})"
+
+BITWISE_OPERATORS = {
+    '&': operator.and_,
+    '|': operator.or_,
+    '^^': operator.xor,
+    '<<': operator.lshift,
+    '>>': operator.rshift,
+}
+
+def bitwise_operation(op: str, left: Any, right: Any) -> Any:
+    """Apply &, |, ^^, << or >> to integers, or &, | and ^^ to two sets or two bit sets"""
+    function = BITWISE_OPERATORS[op]
+    if isinstance(left, int) and isinstance(right, int):
+        if op in ('<<', '>>') and right < 0:
+            raise VanctionRuntimeError(f"Negative shift count: {right}")
+        return function(left, right)
+    if op not in ('<<', '>>'):
+        if isinstance(left, BitSet) and isinstance(right, BitSet):
+            return BitSet.combine(function, left, right)
+        if isinstance(left, (set, frozenset)) and isinstance(right, (set, frozenset)):
+            return function(left, right)
+    raise VanctionRuntimeError(f"Operator {op} is not supported between {type_name(left)} and {type_name(right)}")
+
+# Integers above this many bits are converted to and from decimal text by divide and conquer
+BIGINT_CONVERSION_BITS = 50000
+BIGINT_CONVERSION_DIGITS = 15000
+
+def int_to_decimal_string(n: int) -> str:
+    """Decimal text of an integer in subquadratic time for very large values
+    
+    CPython's int-to-str conversion is quadratic in the number of digits. Above the threshold
+    the integer is split in halves by bit position and reassembled as a decimal.Decimal,
+    whose multiplication is subquadratic and whose string form is a linear copy.
+    """
+    if n.bit_length() <= BIGINT_CONVERSION_BITS:
+        return int.__repr__(n)
+    Dec = decimal.Decimal
+    powers = {}
+    
+    def power_of_two(width):
+        result = powers.get(width)
+        if result is None:
+            if width <= 128:
+                result = Dec(2) ** width
+            elif width - 1 in powers:
+                result = powers[width - 1] * 2
+            else:
+                half = width >> 1
+                result = power_of_two(half) * power_of_two(width - half)
+            powers[width] = result
+        return result
+    
+    def convert(value, width):
+        if width <= 128:
+            return Dec(value)
+        half = width >> 1
+        high = value >> half
+        low = value - (high << half)
+        return convert(low, half) + convert(high, width - half) * power_of_two(half)
+    
+    with decimal.localcontext() as context:
+        context.prec = decimal.MAX_PREC
+        context.Emax = decimal.MAX_EMAX
+        context.Emin = decimal.MIN_EMIN
+        context.traps[decimal.Inexact] = True
+        magnitude = abs(n)
+        text = str(convert(magnitude, magnitude.bit_length()))
+    return '-' + text if n < 0 else text
+
+def decimal_string_to_int(text: str) -> int:
+    """Parse decimal text like int(text), in subquadratic time for very long digit strings
+    
+    Long runs of plain ASCII digits are split in halves and combined with
+    high * 10**k + low, using 10**k = 5**k << k and caching the powers of five.
+    """
+    digits = text.strip()
+    sign = 1
+    if digits[:1] in ('-', '+'):
+        sign = -1 if digits[0] == '-' else 1
+        digits = digits[1:]
+    if len(digits) <= BIGINT_CONVERSION_DIGITS or not (digits.isascii() and digits.isdigit()):
+        return int(text)
+    powers = {}
+    
+    def power_of_five(width):
+        result = powers.get(width)
+        if result is None:
+            if width <= 2048:
+                result = 5 ** width
+            elif width - 1 in powers:
+                result = powers[width - 1] * 5
+            else:
+                half = width >> 1
+                result = power_of_five(half) * power_of_five(width - half)
+            powers[width] = result
+        return result
+    
+    def convert(start, end):
+        if end - start <= 2048:
+            return int(digits[start:end])
+        middle = (start + end + 1) >> 1
+        width = end - middle
+        return convert(middle, end) + ((convert(start, middle) * power_of_five(width)) << width)
+    
+    return sign * convert(0, len(digits))
+
+def decimal_digit_count(n: int) -> int:
+    """Number of decimal digits of |n|, without building its decimal text"""
+    n = abs(n)
+    if n.bit_length() <= BIGINT_CONVERSION_BITS:
+        return len(int.__repr__(n))
+    # The bit length fixes the digit count to within one; a single comparison decides it
+    estimate = int((n.bit_length() - 1) * math.log10(2)) + 1
+    return estimate + 1 if n >= 10 ** estimate else estimate
+
+def to_text(value: Any) -> str:
+    """str() of a value, converting large integers in subquadratic time and ranges as arrays"""
+    cls = value.__class__
+    if cls is int:
+        return int_to_decimal_string(value)
+    if cls in CONTAINER_BRACKETS:
+        return ''.join(_container_pieces(value, set()))
+    return str(value)
+
+DEFAULT_OUTPUT_BUFFER_SIZE = 64 * 1024
+
+# Arrays, ranges and dicts with at least this many entries are printed piece by piece
+STREAMED_CONTAINER_SIZE = 1000
+
+CONTAINER_BRACKETS = {list: ('[', ']'), range: ('[', ']'), ArrayView: ('[', ']'), dict: ('{', '}'),
+                      tuple: ('(', ')')}
+
+# Containers long enough to be printed piece by piece (see STREAMED_CONTAINER_SIZE)
+STREAMED_CONTAINER_TYPES = frozenset((list, dict, range, ArrayView))
+
+def _element_text(value: Any) -> str:
+    return int_to_decimal_string(value) if value.__class__ is int else repr(value)
+
+def _container_pieces(value, active: set):
+    """Yield the text of str(value) for an array, dict or tuple in pieces, recursing into nested ones
+    
+    Lazy ranges and array views are written as the arrays of elements they stand for.
+    """
+    cls = value.__class__
+    opening, closing = CONTAINER_BRACKETS[cls]
+    if id(value) in active:
+        yield opening + '...' + closing
+        return
+    active.add(id(value))
+    yield opening
+    first = True
+    for entry in (value.items() if cls is dict else value):
+        if not first:
+            yield ', '
+        first = False
+        if cls is dict:
+            key, entry = entry
+            yield _element_text(key)
+            yield ': '
+        if entry.__class__ in CONTAINER_BRACKETS:
+            yield from _container_pieces(entry, active)
+        else:
+            yield _element_text(entry)
+    if cls is tuple and len(value) == 1:
+        yield ','
+    yield closing
+    active.discard(id(value))
+
+class OutputWriter:
+    """Destination of System.print
+    
+    With a buffer size of 0 each print is written to sys.stdout straight away, which a
+    terminal line-buffers. Otherwise the text is collected and written in one call once
+    buffer_size characters are pending, and whenever flush() is called.
+    """
+    __slots__ = ('buffer_size', 'pending', 'pending_size')
+    
+    def __init__(self, buffer_size: int = 0):
+        self.buffer_size = buffer_size
+        self.pending: List[str] = []
+        self.pending_size = 0
+    
+    def write(self, text: str):
+        if not self.buffer_size:
+            sys.stdout.write(text)
+            return
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= self.buffer_size:
+            self.flush()
+    
+    def flush(self):
+        if self.pending:
+            text = ''.join(self.pending)
+            self.pending.clear()
+            self.pending_size = 0
+            sys.stdout.write(text)
+        sys.stdout.flush()
+    
+    def emit(self, values: tuple, end: str):
+        """Write the values separated by spaces, followed by end"""
+        texts = []
+        for value in values:
+            if value.__class__ is str:
+                texts.append(value)
+            elif value.__class__ in STREAMED_CONTAINER_TYPES and len(value) >= STREAMED_CONTAINER_SIZE:
+                self.stream(values, end)
+                return
+            else:
+                texts.append(to_text(value))
+        text = ' '.join(texts) + end
+        if not self.buffer_size:
+            sys.stdout.write(text)
+            return
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= self.buffer_size:
+            self.flush()
+    
+    def stream(self, values: tuple, end: str):
+        """Like emit, but serializes arrays and dicts in batches instead of building their whole str() first"""
+        for index, value in enumerate(values):
+            if index:
+                self.write(' ')
+            if value.__class__ in STREAMED_CONTAINER_TYPES:
+                batch = []
+                for piece in _container_pieces(value, set()):
+                    batch.append(piece)
+                    if len(batch) >= 4096:
+                        self.write(''.join(batch))
+                        batch.clear()
+                self.write(''.join(batch))
+            else:
+                self.write(to_text(value))
+        self.write(end)
+
+class Bytes:
+    """Sequence of byte values 0..255 seen through a memoryview
+    
+    Slicing returns a new view of the same memory, so cutting records out of a large
+    binary file does not copy them. Views over bytes are read-only (bytes); views over a
+    bytearray can be written element by element (bytebuffer).
+    """
+    __slots__ = ('view',)
+    
+    def __init__(self, data):
+        self.view = data if isinstance(data, memoryview) else memoryview(data)
+    
+    @property
+    def writable(self) -> bool:
+        return not self.view.readonly
+    
+    def __len__(self):
+        return len(self.view)
+    
+    def __getitem__(self, index: int) -> int:
+        return self.view[index]
+    
+    def __setitem__(self, index: int, value: Any):
+        if not isinstance(value, int) or isinstance(value, bool) or not 0 <= value <= 255:
+            raise VanctionRuntimeError(f"Byte values must be integers from 0 to 255, got {value!r}")
+        self.view[index] = value
+    
+    def slice(self, selection: slice) -> 'Bytes':
+        return Bytes(self.view[selection])
+    
+    def __iter__(self):
+        return iter(self.view)
+    
+    def __eq__(self, other):
+        return isinstance(other, Bytes) and self.view == other.view
+    
+    def __hash__(self):
+        if self.writable:
+            raise TypeError("unhashable type: 'bytebuffer'")
+        return hash(self.view.tobytes())
+    
+    def __repr__(self):
+        kind = "ByteBuffer" if self.writable else "Bytes"
+        return f"{kind}({self.view.tobytes()!r})"
+
+class StringBuilder:
+    """Mutable text buffer that collects appended pieces and joins them once
+    
+    Appending is amortized O(1); toString joins the pieces and keeps the result as the
+    single remaining piece, so repeated conversions do not join again.
+    """
+    __slots__ = ('chunks', 'length')
+    
+    def __init__(self, text: str = ""):
+        self.chunks = [text] if text else []
+        self.length = len(text)
+    
+    def append(self, text: str):
+        self.chunks.append(text)
+        self.length += len(text)
+    
+    def __len__(self):
+        return self.length
+    
+    def __str__(self):
+        if len(self.chunks) > 1:
+            self.chunks = [''.join(self.chunks)]
+        return self.chunks[0] if self.chunks else ""
+    
+    def __repr__(self):
+        return f"StringBuilder({str(self)!r})"
+
+ROPE_LEAF_SIZE = 1024
+
+class _RopeNode:
+    """Concatenation of two rope trees (each a _RopeNode or a plain str leaf)"""
+    __slots__ = ('left', 'right', 'length', 'depth')
+    
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.length = len(left) + len(right)
+        self.depth = 1 + max(_rope_depth(left), _rope_depth(right))
+    
+    def __len__(self):
+        return self.length
+
+def _rope_depth(tree) -> int:
+    return 0 if tree.__class__ is str else tree.depth
+
+def _rope_balance(left, right):
+    """Node over left and right, rotated once if their depths differ by two"""
+    left_depth, right_depth = _rope_depth(left), _rope_depth(right)
+    if left_depth > right_depth + 1:
+        if _rope_depth(left.left) >= _rope_depth(left.right):
+            return _RopeNode(left.left, _RopeNode(left.right, right))
+        inner = left.right
+        return _RopeNode(_RopeNode(left.left, inner.left), _RopeNode(inner.right, right))
+    if right_depth > left_depth + 1:
+        if _rope_depth(right.right) >= _rope_depth(right.left):
+            return _RopeNode(_RopeNode(left, right.left), right.right)
+        inner = right.left
+        return _RopeNode(_RopeNode(left, inner.left), _RopeNode(inner.right, right.right))
+    return _RopeNode(left, right)
+
+def _rope_join(left, right):
+    """Concatenate two rope trees, keeping them height-balanced (AVL join)
+    
+    Short neighbouring leaves are merged so that appending small pieces one at a time
+    does not produce one node per piece.
+    """
+    if not left:
+        return right
+    if not right:
+        return left
+    left_is_leaf, right_is_leaf = left.__class__ is str, right.__class__ is str
+    if left_is_leaf and right_is_leaf:
+        if len(left) + len(right) <= ROPE_LEAF_SIZE:
+            return left + right
+        return _RopeNode(left, right)
+    if right_is_leaf and left.right.__class__ is str and len(left.right) + len(right) <= ROPE_LEAF_SIZE:
+        return _RopeNode(left.left, left.right + right)
+    if left_is_leaf and right.left.__class__ is str and len(left) + len(right.left) <= ROPE_LEAF_SIZE:
+        return _RopeNode(left + right.left, right.right)
+    left_depth, right_depth = _rope_depth(left), _rope_depth(right)
+    if left_depth > right_depth + 1:
+        return _rope_balance(left.left, _rope_join(left.right, right))
+    if right_depth > left_depth + 1:
+        return _rope_balance(_rope_join(left, right.left), right.right)
+    return _RopeNode(left, right)
+
+def _rope_build(text: str, start: int, end: int):
+    """Balanced tree over text[start:end] with leaves of at most ROPE_LEAF_SIZE characters"""
+    if end - start <= ROPE_LEAF_SIZE:
+        return text[start:end]
+    middle = (start + end) // 2
+    return _RopeNode(_rope_build(text, start, middle), _rope_build(text, middle, end))
+
+def _rope_slice(tree, start: int, end: int):
+    """Tree for characters start..end-1, sharing every subtree that lies wholly inside"""
+    if start <= 0 and end >= len(tree):
+        return tree
+    if tree.__class__ is str:
+        return tree[start:end]
+    split = len(tree.left)
+    if end <= split:
+        return _rope_slice(tree.left, start, end)
+    if start >= split:
+        return _rope_slice(tree.right, start - split, end - split)
+    return _rope_join(_rope_slice(tree.left, start, split), _rope_slice(tree.right, 0, end - split))
+
+def _rope_leaves(tree):
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node.__class__ is str:
+            yield node
+        else:
+            stack.append(node.right)
+            stack.append(node.left)
+
+class Rope:
+    """Immutable string stored as a balanced tree of text pieces
+    
+    Concatenation, substrings and indexing take O(log n) steps and share the existing
+    pieces instead of copying the text; the flat string is only built by str().
+    """
+    __slots__ = ('tree',)
+    
+    def __init__(self, tree=""):
+        self.tree = tree
+    
+    @classmethod
+    def of(cls, value: Any) -> 'Rope':
+        if isinstance(value, Rope):
+            return value
+        text = str(value)
+        return cls(_rope_build(text, 0, len(text)))
+    
+    def __len__(self):
+        return len(self.tree)
+    
+    def __add__(self, other):
+        if isinstance(other, Rope):
+            return Rope(_rope_join(self.tree, other.tree))
+        if isinstance(other, str):
+            return Rope(_rope_join(self.tree, Rope.of(other).tree))
+        return NotImplemented
+    
+    def __radd__(self, other):
+        if isinstance(other, str):
+            return Rope(_rope_join(Rope.of(other).tree, self.tree))
+        return NotImplemented
+    
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self.tree)
+        tree = self.tree
+        while tree.__class__ is not str:
+            split = len(tree.left)
+            if index < split:
+                tree = tree.left
+            else:
+                tree, index = tree.right, index - split
+        return tree[index]
+    
+    def slice(self, selection: slice) -> 'Rope':
+        start, end, step = selection.indices(len(self.tree))
+        if step != 1:
+            return Rope.of(str(self)[selection])
+        return Rope(_rope_slice(self.tree, start, end) if start < end else "")
+    
+    def __iter__(self):
+        for leaf in _rope_leaves(self.tree):
+            yield from leaf
+    
+    def __contains__(self, text: Any):
+        return isinstance(text, (str, Rope)) and str(text) in str(self)
+    
+    def __str__(self):
+        if self.tree.__class__ is str:
+            return self.tree
+        return ''.join(_rope_leaves(self.tree))
+    
+    def __eq__(self, other):
+        if isinstance(other, (Rope, str)):
+            return len(self) == len(other) and str(self) == str(other)
+        return False
+    
+    def __hash__(self):
+        return hash(str(self))
+    
+    def __repr__(self):
+        return f"Rope({str(self)!r})"
+
+class LazyIter:
+    """Lazy pipeline over an iterable; its stages run only when the pipeline is consumed
+    
+    Consecutive map/filter/take stages are fused into a single loop over the source, so a
+    chain of stages makes one pass and builds no intermediate arrays.
+    """
+    __slots__ = ('source', 'stages', 'truthy')
+    
+    def __init__(self, source: Callable, stages: tuple, truthy: Callable):
+        self.source = source  # Returns a fresh Python iterator over the source values
+        self.stages = stages
+        self.truthy = truthy
+    
+    def then(self, kind: str, argument: Any) -> 'LazyIter':
+        """Return a new pipeline with one more stage"""
+        return LazyIter(self.source, self.stages + ((kind, argument),), self.truthy)
+    
+    def __iter__(self):
+        items = self.source()
+        fused = []
+        for kind, argument in self.stages:
+            if kind in FUSABLE_STAGES:
+                fused.append((kind, argument))
+                continue
+            items = _run_fused_stages(items, fused, self.truthy)
+            fused = []
+            if kind == 'chunk':
+                items = _chunks(items, argument)
+            else:
+                # flatMap: argument maps each value to an iterator
+                items = itertools.chain.from_iterable(map(argument, items))
+        return _run_fused_stages(items, fused, self.truthy)
+    
+    def __repr__(self):
+        return "<iter>"
+
+FUSABLE_STAGES = frozenset(('map', 'filter', 'take'))
+
+def _run_fused_stages(items, stages: list, truthy: Callable):
+    if not stages:
+        return iter(items)
+    if all(kind == 'map' for kind, _ in stages):
+        for _, function in stages:
+            items = map(function, items)
+        return items
+    return _fused_loop(items, tuple(stages), truthy)
+
+def _fused_loop(items, stages: tuple, truthy: Callable):
+    if any(kind == 'take' and limit <= 0 for kind, limit in stages):
+        return
+    taken = [0] * len(stages)
+    for item in items:
+        stop = False
+        for index, (kind, argument) in enumerate(stages):
+            if kind == 'map':
+                item = argument(item)
+            elif kind == 'filter':
+                if not truthy(argument(item)):
+                    break
+            else:
+                taken[index] += 1
+                if taken[index] >= argument:
+                    stop = True
+        else:
+            yield item
+        if stop:
+            return
+
+def _chunks(items, size: int):
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
 class Environment:
     def __init__(self, parent: Optional['Environment'] = None):
         self.parent = parent
@@ -126,6 +1747,30 @@ class Environment:
         else:
             raise VanctionUndefinedError(name, "variable")
     
+    def resolve(self, name: str) -> Optional['Environment']:
+        """Return the environment that binds name, or None if it is unbound"""
+        env = self
+        while env is not None:
+            if name in env.constants or name in env.variables or name in env.functions:
+                return env
+            env = env.parent
+        return None
+    
+    def share(self, parent: 'Environment') -> 'Environment':
+        """A frame holding the same bindings as this one under another parent
+        
+        Closures use it to keep only the frames that bind their free names alive.
+        """
+        frame = Environment(parent=parent)
+        frame.variables, frame.constants, frame.functions = self.variables, self.constants, self.functions
+        return frame
+    
+    def keep_only(self, names):
+        """Drop every binding except names, once no code runs in this frame any more"""
+        for bindings in (self.variables, self.constants, self.functions):
+            for name in [name for name in bindings if name not in names]:
+                del bindings[name]
+    
     def has_variable(self, name: str) -> bool:
         """Check if variable exists in this environment or parent environments"""
         if name in self.variables or name in self.constants:
@@ -159,13 +1804,265 @@ class Environment:
     def define_function(self, name: str, func: FunctionDef):
         self.functions[name] = func
     
-    def get_function(self, name: str) -> FunctionDef:
-        if name in self.functions:
-            return self.functions[name]
-        elif self.parent:
-            return self.parent.get_function(name)
+    def get_function(self, name: str) -> FunctionDef:
+        if name in self.functions:
+            return self.functions[name]
+        elif self.parent:
+            return self.parent.get_function(name)
+        else:
+            raise VanctionUndefinedError(name, "function")
+
+def free_names(node, bound: frozenset = frozenset()) -> set:
+    """Collect the names an expression reads from its enclosing scopes"""
+    names = set()
+    _collect_free_names(node, bound, names)
+    return names
+
+def _collect_free_names(node, bound: frozenset, names: set):
+    if isinstance(node, Identifier):
+        if node.name not in bound:
+            names.add(node.name)
+    elif isinstance(node, MemberExpression):
+        # Member access resolves both the dotted name and the object name
+        for name in (f"{node.object}.{node.property}", node.object):
+            if name.split('.', 1)[0] not in bound:
+                names.add(name)
+    elif isinstance(node, LambdaExpression):
+        _collect_free_names(node.body, bound | frozenset(node.parameters), names)
+        return
+    elif isinstance(node, ComprehensionExpression):
+        # Each clause's variables are bound in later clauses and in the element
+        for clause in node.clauses:
+            _collect_free_names(clause.iterable, bound, names)
+            bound = bound | frozenset(clause.variables)
+            for condition in clause.conditions:
+                _collect_free_names(condition, bound, names)
+        for part in (node.key, node.element):
+            if part is not None:
+                _collect_free_names(part, bound, names)
+        return
+    elif isinstance(node, CallExpression) and isinstance(node.function, str):
+        if node.function.split('.', 1)[0] not in bound:
+            names.add(node.function)
+            names.add(node.function.split('.', 1)[0])
+    for child in iter_child_nodes(node):
+        _collect_free_names(child, bound, names)
+
+# Checks for optional type annotations (func f(n: int) -> int, x: float = 0.0)
+TYPE_CHECKS = {
+    'int': lambda value: isinstance(value, int) and not isinstance(value, bool),
+    'float': lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    'number': lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    'str': lambda value: isinstance(value, str),
+    'string': lambda value: isinstance(value, str),
+    'rope': lambda value: isinstance(value, Rope),
+    'bytes': lambda value: isinstance(value, Bytes),
+    'bytebuffer': lambda value: isinstance(value, Bytes) and value.writable,
+    'stringbuilder': lambda value: isinstance(value, StringBuilder),
+    'bool': lambda value: isinstance(value, bool),
+    'array': lambda value: isinstance(value, (list, ArrayView)),
+    'numarray': lambda value: isinstance(value, NumArray),
+    'table': lambda value: isinstance(value, Table),
+    'set': lambda value: isinstance(value, (set, frozenset)),
+    'deque': lambda value: isinstance(value, deque),
+    'heap': lambda value: isinstance(value, Heap),
+    'sortedmap': lambda value: isinstance(value, SortedMap),
+    'bitset': lambda value: isinstance(value, BitSet),
+    'pvector': lambda value: isinstance(value, PVector),
+    'pmap': lambda value: isinstance(value, PMap),
+    'dict': lambda value: isinstance(value, dict),
+    'tuple': lambda value: isinstance(value, tuple),
+    'generator': lambda value: isinstance(value, VanctionGenerator),
+    'func': lambda value: callable(value) or isinstance(value, FunctionDef),
+    'any': lambda value: True,
+}
+
+NUMERIC_TYPES = frozenset(('int', 'float', 'number'))
+
+# Operators that can skip the generic checks once both operands are proven numeric
+FAST_NUMERIC_OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '%': operator.mod,
+    '^': operator.pow,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+}
+
+ARITHMETIC_OPERATORS = frozenset(('+', '-', '*', '/', '%', '^'))
+
+def type_name(value: Any) -> str:
+    """Return the Vanction name of a value's type"""
+    if value is None:
+        return "unassigned"
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        return "str"
+    if isinstance(value, Rope):
+        return "rope"
+    if isinstance(value, Bytes):
+        return "bytebuffer" if value.writable else "bytes"
+    if isinstance(value, StringBuilder):
+        return "stringbuilder"
+    if isinstance(value, (list, ArrayView)):
+        return "array"
+    if isinstance(value, NumArray):
+        return "numarray"
+    if isinstance(value, Table):
+        return "table"
+    if isinstance(value, (set, frozenset)):
+        return "set"
+    if isinstance(value, deque):
+        return "deque"
+    if isinstance(value, Heap):
+        return "heap"
+    if isinstance(value, SortedMap):
+        return "sortedmap"
+    if isinstance(value, BitSet):
+        return "bitset"
+    if isinstance(value, PVector):
+        return "pvector"
+    if isinstance(value, PMap):
+        return "pmap"
+    if isinstance(value, dict):
+        return "dict"
+    if isinstance(value, tuple):
+        return "tuple"
+    if isinstance(value, range):
+        return "range"
+    if isinstance(value, VanctionGenerator):
+        return "generator"
+    if isinstance(value, LazyIter):
+        return "iter"
+    if isinstance(value, AnytionType):
+        return "anytion"
+    if callable(value) or isinstance(value, FunctionDef):
+        return "func"
+    return type(value).__name__
+
+def specialize_numeric(nodes: list, numeric_names: set):
+    """Attach fast operators to binary expressions whose operands are proven numeric
+    
+    numeric_names holds parameters and annotated variables declared int/float/number.
+    A name stays proven only if every assignment to it in nodes is annotated numeric.
+    Lambdas and nested functions have their own scopes and are left untouched.
+    """
+    unproven = set()
+    for node in nodes:
+        _collect_assignments(node, numeric_names, unproven)
+    proven = numeric_names - unproven
+    if not proven:
+        return
+    for node in nodes:
+        _mark_fast_operators(node, proven)
+
+def _collect_assignments(node, annotated: set, unproven: set):
+    if isinstance(node, (LambdaExpression, FunctionDef)):
+        return
+    if isinstance(node, BinaryExpression) and node.operator == '=' and isinstance(node.left, Identifier):
+        if node.type_annotation in NUMERIC_TYPES:
+            annotated.add(node.left.name)
         else:
-            raise VanctionUndefinedError(name, "function")
+            unproven.add(node.left.name)
+    elif isinstance(node, MultiAssignmentExpression):
+        unproven.update(var.name for var in node.variables)
+    elif isinstance(node, AugmentedAssignment) and isinstance(node.target, Identifier):
+        # Adding a number literal keeps a numeric variable numeric (i++, total += 1)
+        if not (isinstance(node.value, Literal) and _is_proven_numeric(node.value, set())):
+            unproven.add(node.target.name)
+    elif isinstance(node, ForStatement) and node.variable:
+        unproven.update(node.variables or [node.variable])
+    elif isinstance(node, ComprehensionExpression):
+        for clause in node.clauses:
+            unproven.update(clause.variables)
+    elif isinstance(node, TryStatement) and node.exception_var:
+        unproven.add(node.exception_var)
+    for child in iter_child_nodes(node):
+        _collect_assignments(child, annotated, unproven)
+
+def _is_proven_numeric(node, proven: set) -> bool:
+    if isinstance(node, Literal):
+        return isinstance(node.value, (int, float)) and not isinstance(node.value, bool) and not node.is_format_string
+    if isinstance(node, Identifier):
+        return node.name in proven
+    if isinstance(node, UnaryExpression):
+        return node.operator in ('+', '-') and _is_proven_numeric(node.operand, proven)
+    if isinstance(node, BinaryExpression):
+        return (node.operator in ARITHMETIC_OPERATORS and
+                _is_proven_numeric(node.left, proven) and _is_proven_numeric(node.right, proven))
+    return False
+
+def _mark_fast_operators(node, proven: set):
+    if isinstance(node, (LambdaExpression, FunctionDef)):
+        return
+    if (isinstance(node, BinaryExpression) and node.operator in FAST_NUMERIC_OPERATORS and
+            _is_proven_numeric(node.left, proven) and _is_proven_numeric(node.right, proven)):
+        node.fast_op = FAST_NUMERIC_OPERATORS[node.operator]
+    for child in iter_child_nodes(node):
+        _mark_fast_operators(child, proven)
+
+def contains_lambda(node) -> bool:
+    """Check whether a lambda expression appears anywhere inside node"""
+    if isinstance(node, LambdaExpression):
+        return True
+    return any(contains_lambda(child) for child in iter_child_nodes(node))
+
+def contains_assignment(node) -> bool:
+    """Check whether an assignment to a variable (=, x += v, x++, a, b = ...) appears inside node"""
+    if isinstance(node, MultiAssignmentExpression):
+        return True
+    if isinstance(node, BinaryExpression) and node.operator == '=':
+        return True
+    if isinstance(node, AugmentedAssignment) and isinstance(node.target, Identifier):
+        return True
+    return any(contains_assignment(child) for child in iter_child_nodes(node))
+
+def lambda_free_names(node) -> set:
+    """Names the lambdas inside node read from their enclosing scopes"""
+    if isinstance(node, LambdaExpression):
+        return free_names(node)
+    names = set()
+    for child in iter_child_nodes(node):
+        names |= lambda_free_names(child)
+    return names
+
+def bound_names(nodes: list) -> set:
+    """Names statements bind in their scope: assignment targets, loop and catch variables, functions"""
+    annotated, names = set(), set()
+    for node in nodes:
+        _collect_assignments(node, annotated, names)
+        if isinstance(node, FunctionDef):
+            names.add(node.name)
+    return names | annotated
+
+def lambda_captured_values(fn: Callable, global_env: 'Environment') -> list:
+    """(name, value) pairs of the non-global bindings a lambda's body reads, as they are now"""
+    expr = fn.expression
+    names = getattr(expr, 'free_names', None)
+    if names is None:
+        names = tuple(sorted(free_names(expr)))
+        expr.free_names = names
+    values = []
+    for name in names:
+        owner = fn.closure_env.resolve(name)
+        if owner is None or owner is global_env:
+            continue
+        for bindings in (owner.constants, owner.variables, owner.functions):
+            if name in bindings:
+                values.append((name, bindings[name]))
+                break
+    return values
 
 class ReturnException(Exception):
     def __init__(self, value):
@@ -213,10 +2110,16 @@ class VanctionException(Exception):
         return error_msg
 
 class Interpreter:
-    def __init__(self):
+    def __init__(self, output_buffer_size: int = 0):
+        self.output = OutputWriter(output_buffer_size)
         self.global_env = Environment()
         self.setup_builtin_functions()
+        # Assigning one of these names inside a function makes a local binding instead of replacing
+        # the builtin, as long as the global binding is still the original builtin
+        self.builtins = dict(self.global_env.variables)
         self.current_file = ""
+        self.format_string_cache: Dict[str, list] = {}
+        self.record_types: Dict[str, type] = {}
     
     def setup_builtin_functions(self):
         # System.print function with end parameter support
@@ -226,70 +2129,124 @@ class Interpreter:
             
             # If no positional arguments but have message named parameter
             if not args and 'message' in kwargs:
-                output = str(kwargs['message'])
-            elif args:
-                # Use positional arguments
-                output = ' '.join(str(arg) for arg in args)
-            else:
-                output = ''
+                args = (kwargs['message'],)
             
-            print(output, end=end)
+            self.output.emit(args, '\n' if end is None else end)
             return None
         
         # System.input function
         def system_input(prompt=""):
+            # Pending output must appear before the prompt
+            self.output.flush()
             try:
                 return input(prompt)
             except (EOFError, KeyboardInterrupt):
                 return ""
         
+        def system_lines():
+            """Lazily iterate over the lines of standard input, without line endings"""
+            self.output.flush()
+            
+            def lines():
+                for line in sys.stdin:
+                    yield line.rstrip('\r\n')
+            return lines()
+        
         # Range function implementation
-        def range_func(n):
-            """Generate a list of integers from 1 to n"""
-            if not isinstance(n, int):
-                raise VanctionTypeError("integer", type(n).__name__)
-            if n < 0:
-                raise VanctionRuntimeError(f"range: argument must be non-negative, got {n}")
-            return list(range(1, n + 1))
+        def range_func(*args):
+            """Return a lazy range: range(n) is 1..n, range(start, stop[, step]) excludes stop"""
+            for arg in args:
+                if not isinstance(arg, int) or isinstance(arg, bool):
+                    raise VanctionTypeError("integer", type(arg).__name__)
+            if len(args) == 1:
+                n = args[0]
+                if n < 0:
+                    raise VanctionRuntimeError(f"range: argument must be non-negative, got {n}")
+                return range(1, n + 1)
+            if len(args) in (2, 3):
+                if len(args) == 3 and args[2] == 0:
+                    raise VanctionRuntimeError("range: step must not be zero")
+                return range(*args)
+            raise VanctionFunctionCallError(f"range expects 1 to 3 arguments, got {len(args)}")
         
         self.global_env.define("System.print", system_print)
         self.global_env.define("System.input", system_input)
+        self.global_env.define("System.flush", lambda: self.output.flush())
+        self.global_env.define("System.lines", system_lines)
         self.global_env.define("range", range_func)
         
+        def next_func(iterator, default=_MISSING):
+            """Advance a generator (or other iterator) by one value"""
+            if not hasattr(iterator, '__next__'):
+                raise VanctionTypeError("generator", type_name(iterator), self.current_file)
+            try:
+                return next(iterator)
+            except StopIteration:
+                if default is _MISSING:
+                    raise VanctionRuntimeError("next: generator is exhausted", self.current_file)
+                return default
+        
+        def to_int(value=0, *base):
+            """int(), parsing long decimal strings in subquadratic time"""
+            if isinstance(value, str) and not base:
+                return decimal_string_to_int(value)
+            return int(value, *base)
+        
         # Other built-in functions
         self.global_env.define("len", len)
-        self.global_env.define("str", str)
-        self.global_env.define("int", int)
+        self.global_env.define("next", next_func)
+        self.global_env.define("str", lambda value="": to_text(value))
+        self.global_env.define("int", to_int)
         self.global_env.define("float", float)
         
         # Array operation functions
+        def array_argument(arr):
+            """The list a mutating array builtin changes in place
+            
+            Live views of the list copy their elements out first, a view is changed in its own
+            storage, and a range is turned into a new array of its numbers.
+            """
+            if isinstance(arr, list):
+                if _LIVE_VIEWS:
+                    release_views(arr)
+                return arr
+            if isinstance(arr, ArrayView):
+                return arr.own()
+            if isinstance(arr, range):
+                return list(arr)
+            raise VanctionTypeError("array", type_name(arr))
+        
+        def array_items(arr):
+            """The elements a reading array builtin works on, as a list"""
+            if isinstance(arr, list):
+                return arr
+            if isinstance(arr, (ArrayView, range)):
+                return list(arr)
+            raise VanctionTypeError("array", type_name(arr))
+        
         def array_append(arr, item):
             """Append element to array end"""
-            if not isinstance(arr, list):
-                raise VanctionTypeError("array", type(arr).__name__)
+            arr = array_argument(arr)
             arr.append(item)
             return arr
         
         def array_remove(arr, item):
             """Remove element from array"""
-            if not isinstance(arr, list):
-                raise VanctionTypeError("array", type(arr).__name__)
+            arr = array_argument(arr)
             if item in arr:
                 arr.remove(item)
             return arr
         
         def array_pop(arr, index=-1):
             """Remove and return element at specified index"""
-            if not isinstance(arr, list):
-                raise VanctionTypeError("array", type(arr).__name__)
+            arr = array_argument(arr)
             if len(arr) == 0:
                 raise VanctionRuntimeError("Cannot pop from empty array")
             return arr.pop(index)
         
         def array_index(arr, item):
             """Find element index in array"""
-            if not isinstance(arr, list):
-                raise VanctionTypeError("array", type(arr).__name__)
+            arr = array_items(arr)
             try:
                 return arr.index(item)
             except ValueError:
@@ -297,29 +2254,25 @@ class Interpreter:
         
         def array_insert(arr, index, item):
             """Insert element at specified index"""
-            if not isinstance(arr, list):
-                raise VanctionTypeError("array", type(arr).__name__)
+            arr = array_argument(arr)
             arr.insert(index, item)
             return arr
         
         def array_clear(arr):
             """Clear all elements from array"""
-            if not isinstance(arr, list):
-                raise VanctionTypeError("array", type(arr).__name__)
+            arr = array_argument(arr)
             arr.clear()
             return arr
         
         def array_reverse(arr):
             """Reverse array order"""
-            if not isinstance(arr, list):
-                raise VanctionTypeError("array", type(arr).__name__)
+            arr = array_argument(arr)
             arr.reverse()
             return arr
         
         def array_sort(arr):
             """Sort array elements"""
-            if not isinstance(arr, list):
-                raise VanctionTypeError("array", type(arr).__name__)
+            arr = array_argument(arr)
             try:
                 arr.sort()
                 return arr
@@ -328,17 +2281,21 @@ class Interpreter:
         
         def array_join(arr, separator=""):
             """Join array elements into string"""
-            if not isinstance(arr, list):
-                raise VanctionTypeError("array", type(arr).__name__)
+            arr = array_items(arr)
             try:
                 return separator.join(str(item) for item in arr)
             except TypeError:
                 raise VanctionRuntimeError("All elements must be convertible to string")
         
+        def array_from(iterable):
+            """Collect the elements of any iterable (range, string, tuple, generator...) into a new array"""
+            if isinstance(iterable, dict):
+                return list(iterable.keys())
+            return list(self.iterate(iterable))
+        
         def array_slice(arr, start=0, end=None):
             """Return array slice"""
-            if not isinstance(arr, list):
-                raise VanctionTypeError("array", type(arr).__name__)
+            arr = array_items(arr)
             if not isinstance(start, int):
                 raise VanctionTypeError("integer", type(start).__name__)
             if end is not None and not isinstance(end, int):
@@ -354,6 +2311,7 @@ class Interpreter:
         self.global_env.define("array.sort", array_sort)
         self.global_env.define("array.join", array_join)
         self.global_env.define("array.slice", array_slice)
+        self.global_env.define("array.from", array_from)
         
         # Dictionary operation functions
         def dict_keys(d):
@@ -439,6 +2397,9 @@ class Interpreter:
                 raise VanctionRuntimeError("file_read: mode must be a string", self.current_file)
             
             try:
+                if 'b' in mode:
+                    with open(filename, mode) as f:
+                        return Bytes(f.read())
                 with open(filename, mode, encoding='utf-8') as f:
                     return f.read()
             except FileNotFoundError:
@@ -450,18 +2411,40 @@ class Interpreter:
             """Write content to file"""
             if not isinstance(filename, str):
                 raise VanctionRuntimeError("file_write: filename must be a string", self.current_file)
-            if not isinstance(content, str):
-                content = str(content)
             if not isinstance(mode, str):
                 raise VanctionRuntimeError("file_write: mode must be a string", self.current_file)
+            if 'b' in mode:
+                content = byte_data(content, "file_write")
+            elif not isinstance(content, str):
+                content = str(content)
             
             try:
+                if 'b' in mode:
+                    with open(filename, mode) as f:
+                        return f.write(content)
                 with open(filename, mode, encoding='utf-8') as f:
                     f.write(content)
                 return len(content)
             except Exception as e:
                 raise VanctionRuntimeError(f"file_write: error writing file '{filename}': {str(e)}", self.current_file)
         
+        def file_lines(filename):
+            """Lazily iterate over the lines of a text file, without line endings"""
+            if not isinstance(filename, str):
+                raise VanctionRuntimeError("file_lines: filename must be a string", self.current_file)
+            try:
+                f = open(filename, 'r', encoding='utf-8')
+            except FileNotFoundError:
+                raise VanctionRuntimeError(f"file_lines: file '{filename}' not found", self.current_file)
+            except Exception as e:
+                raise VanctionRuntimeError(f"file_lines: error reading file '{filename}': {str(e)}", self.current_file)
+            
+            def lines():
+                with f:
+                    for line in f:
+                        yield line.rstrip('\r\n')
+            return lines()
+        
         def file_exists(filename):
             """Check if file exists"""
             if not isinstance(filename, str):
@@ -483,6 +2466,9 @@ class Interpreter:
         
         self.global_env.define("File.read", file_read)
         self.global_env.define("File.write", file_write)
+        self.global_env.define("File.readBytes", lambda filename: file_read(filename, "rb"))
+        self.global_env.define("File.writeBytes", lambda filename, data, append=False: file_write(filename, data, "ab" if append else "wb"))
+        self.global_env.define("File.lines", file_lines)
         self.global_env.define("File.exists", file_exists)
         self.global_env.define("File.delete", file_delete)
         
@@ -537,67 +2523,1031 @@ class Interpreter:
                 raise VanctionRuntimeError("str.strip: chars must be a string", self.current_file)
             return s.strip(chars)
         
-        def str_lower(s):
-            """Convert string to lowercase"""
-            if not isinstance(s, str):
-                raise VanctionRuntimeError("str.lower: argument must be a string", self.current_file)
-            return s.lower()
+        def str_lower(s):
+            """Convert string to lowercase"""
+            if not isinstance(s, str):
+                raise VanctionRuntimeError("str.lower: argument must be a string", self.current_file)
+            return s.lower()
+        
+        def str_upper(s):
+            """Convert string to uppercase"""
+            if not isinstance(s, str):
+                raise VanctionRuntimeError("str.upper: argument must be a string", self.current_file)
+            return s.upper()
+        
+        def str_startswith(s, prefix):
+            """Check if string starts with prefix"""
+            if not isinstance(s, str):
+                raise VanctionRuntimeError("str.startswith: first argument must be a string", self.current_file)
+            if not isinstance(prefix, str):
+                prefix = str(prefix)
+            return s.startswith(prefix)
+        
+        def str_endswith(s, suffix):
+            """Check if string ends with suffix"""
+            if not isinstance(s, str):
+                raise VanctionRuntimeError("str.endswith: first argument must be a string", self.current_file)
+            if not isinstance(suffix, str):
+                suffix = str(suffix)
+            return s.endswith(suffix)
+        
+        def str_substring(s, start, end=None):
+            """Return substring from start to end"""
+            if not isinstance(s, (str, Rope)):
+                raise VanctionRuntimeError("str.substring: first argument must be a string", self.current_file)
+            if not isinstance(start, int):
+                raise VanctionRuntimeError("str.substring: start must be an integer", self.current_file)
+            if end is not None and not isinstance(end, int):
+                raise VanctionRuntimeError("str.substring: end must be an integer", self.current_file)
+            if isinstance(s, Rope):
+                # Rope substrings share the rope's pieces instead of copying the text
+                return s.slice(slice(start, end))
+            return s[start:end]
+        
+        def str_find(s, substring, start=0, end=None):
+            """Find substring in string"""
+            if not isinstance(s, str):
+                raise VanctionRuntimeError("str.find: first argument must be a string", self.current_file)
+            if not isinstance(substring, str):
+                substring = str(substring)
+            if not isinstance(start, int):
+                raise VanctionRuntimeError("str.find: start must be an integer", self.current_file)
+            if end is not None and not isinstance(end, int):
+                raise VanctionRuntimeError("str.find: end must be an integer", self.current_file)
+            return s.find(substring, start, end)
+        
+        # Register string operation functions
+        self.global_env.define("str.contains", str_contains)
+        self.global_env.define("str.replace", str_replace)
+        self.global_env.define("str.split", str_split)
+        self.global_env.define("str.strip", str_strip)
+        self.global_env.define("str.lower", str_lower)
+        self.global_env.define("str.upper", str_upper)
+        self.global_env.define("str.startswith", str_startswith)
+        self.global_env.define("str.endswith", str_endswith)
+        self.global_env.define("str.substring", str_substring)
+        self.global_env.define("str.find", str_find)
+        
+        # Memoization functions
+        def memo_cache_of(fn, name):
+            """Return the memo cache attached to a memoized function"""
+            if isinstance(fn, PersistentFunction):
+                return fn
+            if isinstance(fn, FunctionDef):
+                cache = getattr(fn, 'memo_cache', None)
+                if fn.memo and cache is None:
+                    cache = fn.memo_cache = MemoCache()
+                if cache is not None:
+                    return cache
+            elif isinstance(fn, MemoizedFunction):
+                return fn.cache
+            raise VanctionRuntimeError(f"{name}: function is not memoized", self.current_file)
+        
+        def cache_memoize(fn, size=DEFAULT_MEMO_SIZE):
+            """Cache results of fn by argument tuple, keeping at most size entries (LRU)"""
+            if not isinstance(size, int) or isinstance(size, bool) or size < 1:
+                raise VanctionRuntimeError("Cache.memoize: size must be a positive integer", self.current_file)
+            if isinstance(fn, FunctionDef):
+                if fn.generator:
+                    raise VanctionRuntimeError(f"Cache.memoize: generator function '{fn.name}' cannot be memoized",
+                                               self.current_file)
+                # Wrap the definition rather than changing it, so only calls through the handle are cached;
+                # a nested function runs in (and its cache belongs to) the scope it was defined in
+                closure_env = getattr(fn, 'closure_env', None)
+                return MemoizedFunction(lambda *args: self.invoke_function(fn, list(args), closure_env),
+                                        MemoCache(size))
+            if isinstance(fn, MemoizedFunction):
+                fn = fn.function
+            if not callable(fn):
+                raise VanctionTypeError("function", type_name(fn))
+            return MemoizedFunction(fn, MemoCache(size))
+        
+        def cache_stats(fn):
+            """Return hits, misses, evictions and current size of a memoized function"""
+            return memo_cache_of(fn, "Cache.stats").stats()
+        
+        def cache_clear(fn):
+            """Drop all cached results of a memoized function"""
+            memo_cache_of(fn, "Cache.clear").clear()
+            return None
+        
+        persistent_stores = {}
+        
+        def cache_persistent(fn, path, max_bytes=DEFAULT_PERSISTENT_CACHE_BYTES):
+            """Reuse results of a deterministic function across runs via an on-disk store at path"""
+            if not isinstance(path, str):
+                raise VanctionRuntimeError("Cache.persistent: path must be a string", self.current_file)
+            if not isinstance(max_bytes, int) or isinstance(max_bytes, bool) or max_bytes < 1:
+                raise VanctionRuntimeError("Cache.persistent: max_bytes must be a positive integer", self.current_file)
+            
+            # Identity: function name plus a hash of its source, so edited functions miss the old entries
+            if isinstance(fn, FunctionDef):
+                source = ast_fingerprint(fn)
+                name = fn.name
+                function = lambda *args: self.execute_function(fn, list(args))
+            elif callable(fn) and hasattr(fn, 'expression'):
+                # Lambdas also depend on the current values of the local names they read
+                source = ast_fingerprint(fn.expression) + repr(lambda_captured_values(fn, self.global_env))
+                name = "lambda"
+                function = fn
+            else:
+                raise VanctionTypeError("function", type_name(fn))
+            identity = f"{name}:{hashlib.sha256(source.encode('utf-8')).hexdigest()}"
+            
+            store_path = os.path.abspath(path)
+            store = persistent_stores.get(store_path)
+            if store is None or store.max_bytes != max_bytes:
+                try:
+                    store = PersistentStore(store_path, max_bytes)
+                except (sqlite3.Error, OSError) as e:
+                    raise VanctionRuntimeError(f"Cache.persistent: cannot open cache '{path}': {e}", self.current_file)
+                persistent_stores[store_path] = store
+            return PersistentFunction(function, store, identity)
+        
+        self.global_env.define("Cache.memoize", cache_memoize)
+        self.global_env.define("Cache.persistent", cache_persistent)
+        self.global_env.define("Cache.stats", cache_stats)
+        self.global_env.define("Cache.clear", cache_clear)
+        
+        # Lazy iterator pipeline functions
+        def pipeline(iterable):
+            """Wrap any iterable value as a lazy pipeline (pipelines are returned as is)"""
+            if isinstance(iterable, LazyIter):
+                return iterable
+            self.iterate(iterable)  # Fail early on non-iterable values
+            return LazyIter(lambda: self.iterate(iterable), (), self.is_truthy)
+        
+        def iter_map(iterable, fn):
+            """Lazily apply fn to every value"""
+            return pipeline(iterable).then('map', self.fast_callable(fn, "Iter.map"))
+        
+        def iter_filter(iterable, fn):
+            """Lazily keep the values for which fn is truthy"""
+            return pipeline(iterable).then('filter', self.fast_callable(fn, "Iter.filter"))
+        
+        def iter_take(iterable, n):
+            """Lazily keep at most the first n values"""
+            if not isinstance(n, int) or isinstance(n, bool) or n < 0:
+                raise VanctionRuntimeError("Iter.take: n must be a non-negative integer", self.current_file)
+            return pipeline(iterable).then('take', n)
+        
+        def iter_chunk(iterable, size):
+            """Lazily group values into arrays of size elements (the last may be shorter)"""
+            if not isinstance(size, int) or isinstance(size, bool) or size < 1:
+                raise VanctionRuntimeError("Iter.chunk: size must be a positive integer", self.current_file)
+            return pipeline(iterable).then('chunk', size)
+        
+        def iter_flat_map(iterable, fn):
+            """Lazily apply fn to every value and flatten the iterables it returns"""
+            function = self.fast_callable(fn, "Iter.flatMap")
+            return pipeline(iterable).then('flatMap', lambda item: self.iterate(function(item)))
+        
+        def iter_zip(*iterables):
+            """Lazily pair up values from several iterables, stopping at the shortest"""
+            for iterable in iterables:
+                self.iterate(iterable)
+            return LazyIter(lambda: zip(*(self.iterate(iterable) for iterable in iterables)), (), self.is_truthy)
+        
+        def iter_to_array(iterable):
+            """Run a pipeline and collect its values into an array"""
+            return list(pipeline(iterable))
+        
+        def iter_reduce(iterable, fn, initial=_MISSING):
+            """Run a pipeline and fold its values with fn(accumulator, value)"""
+            function = self.fast_callable(fn, "Iter.reduce")
+            values = iter(pipeline(iterable))
+            if initial is _MISSING:
+                initial = next(values, _MISSING)
+                if initial is _MISSING:
+                    raise VanctionRuntimeError("Iter.reduce: empty iterator with no initial value", self.current_file)
+            return functools.reduce(function, values, initial)
+        
+        self.global_env.define("Iter.map", iter_map)
+        self.global_env.define("Iter.filter", iter_filter)
+        self.global_env.define("Iter.take", iter_take)
+        self.global_env.define("Iter.chunk", iter_chunk)
+        self.global_env.define("Iter.flatMap", iter_flat_map)
+        self.global_env.define("Iter.zip", iter_zip)
+        self.global_env.define("Iter.toArray", iter_to_array)
+        self.global_env.define("Iter.reduce", iter_reduce)
+        
+        # Bulk reduction functions: the loop over the values runs natively
+        def key_values(iterable, key, name):
+            """Iterate over the values of iterable, mapped through key when one is given"""
+            values = self.iterate(iterable)
+            if key is None:
+                return values
+            return map(self.fast_callable(key, name), values)
+        
+        def truth_values(iterable, predicate, name):
+            """Iterate over the Vanction truthiness of each value (or of predicate(value))"""
+            return map(self.is_truthy, key_values(iterable, predicate, name))
+        
+        def sum_func(iterable, key=None):
+            """Sum the values, or key(value) for each value"""
+            try:
+                return sum(key_values(iterable, key, "sum"))
+            except TypeError:
+                raise VanctionRuntimeError("sum: values must be numbers", self.current_file)
+        
+        def extreme(function, name):
+            def find(iterable, key=None, fallback=_MISSING):
+                values = self.iterate(iterable)
+                try:
+                    if key is None:
+                        return function(values) if fallback is _MISSING else function(values, default=fallback)
+                    key_function = self.fast_callable(key, name)
+                    if fallback is _MISSING:
+                        return function(values, key=key_function)
+                    return function(values, key=key_function, default=fallback)
+                except ValueError:
+                    raise VanctionRuntimeError(f"{name}: empty sequence has no {name}imum", self.current_file)
+                except TypeError:
+                    raise VanctionRuntimeError(f"{name}: values cannot be compared", self.current_file)
+            find.__doc__ = f"Return the {name}imum value (or fallback if there are none), compared by key(value)"
+            return find
+        
+        def sorted_func(iterable, key=None, reverse=False):
+            """Return a new sorted array of the values, ordered by key(value) when a key is given"""
+            try:
+                if key is None:
+                    return sorted(self.iterate(iterable), reverse=self.is_truthy(reverse))
+                return sorted(self.iterate(iterable), key=self.fast_callable(key, "sorted"),
+                              reverse=self.is_truthy(reverse))
+            except TypeError:
+                raise VanctionRuntimeError("sorted: values cannot be compared", self.current_file)
+        
+        def any_func(iterable, predicate=None):
+            """Check whether any value (or predicate(value)) is truthy, stopping at the first one"""
+            return any(truth_values(iterable, predicate, "any"))
+        
+        def all_func(iterable, predicate=None):
+            """Check whether every value (or predicate(value)) is truthy, stopping at the first falsy one"""
+            return all(truth_values(iterable, predicate, "all"))
+        
+        def count_func(iterable, predicate=None):
+            """Count the values, or only those for which predicate(value) is truthy"""
+            if predicate is None:
+                if isinstance(iterable, (list, ArrayView, tuple, str, dict, range)):
+                    return len(iterable)
+                return sum(1 for _ in self.iterate(iterable))
+            return sum(truth_values(iterable, predicate, "count"))
+        
+        def enumerate_func(iterable, start=0):
+            """Lazily pair each value with its index: (index, value)"""
+            if not isinstance(start, int) or isinstance(start, bool):
+                raise VanctionTypeError("integer", type_name(start), self.current_file)
+            self.iterate(iterable)
+            return LazyIter(lambda: enumerate(self.iterate(iterable), start), (), self.is_truthy)
+        
+        self.global_env.define("sum", sum_func)
+        self.global_env.define("min", extreme(min, "min"))
+        self.global_env.define("max", extreme(max, "max"))
+        self.global_env.define("sorted", sorted_func)
+        self.global_env.define("any", any_func)
+        self.global_env.define("all", all_func)
+        self.global_env.define("count", count_func)
+        self.global_env.define("enumerate", enumerate_func)
+        self.global_env.define("zip", iter_zip)
+        
+        # Typed numeric array functions
+        def numarray_dtype(dtype, name):
+            if dtype not in NUMARRAY_DTYPES:
+                raise VanctionRuntimeError(f"{name}: unknown element type '{dtype}' (expected one of {', '.join(NUMARRAY_DTYPES)})",
+                                           self.current_file)
+            return dtype
+        
+        def numarray_argument(value, name):
+            if not isinstance(value, NumArray):
+                raise VanctionTypeError(f"numarray for {name}", type_name(value), self.current_file)
+            return value
+        
+        def numarray_of(iterable, dtype="f64"):
+            """Create a NumArray holding the values of any iterable"""
+            dtype = numarray_dtype(dtype, "NumArray.of")
+            try:
+                return NumArray.build(self.iterate(iterable), dtype)
+            except (TypeError, ValueError, OverflowError):
+                raise VanctionRuntimeError(f"NumArray.of: values do not fit element type '{dtype}'", self.current_file)
+        
+        def numarray_zeros(n, dtype="f64"):
+            """Create a NumArray of n zeros"""
+            if not isinstance(n, int) or isinstance(n, bool) or n < 0:
+                raise VanctionRuntimeError("NumArray.zeros: n must be a non-negative integer", self.current_file)
+            dtype = numarray_dtype(dtype, "NumArray.zeros")
+            if numpy is not None:
+                return NumArray(numpy.zeros(n, dtype=NUMARRAY_DTYPES[dtype][1]), dtype)
+            return NumArray(array.array(NUMARRAY_DTYPES[dtype][0], bytes(array.array(NUMARRAY_DTYPES[dtype][0]).itemsize * n)), dtype)
+        
+        def numarray_range(*args, dtype="i64"):
+            """Create a NumArray holding range(...) (same arguments as range)"""
+            dtype = numarray_dtype(dtype, "NumArray.range")
+            values = range_func(*args)
+            if numpy is not None:
+                return NumArray(numpy.arange(values.start, values.stop, values.step, dtype=NUMARRAY_DTYPES[dtype][1]), dtype)
+            return NumArray.build(values, dtype)
+        
+        def numarray_sum(a):
+            """Sum all elements"""
+            a = numarray_argument(a, "NumArray.sum")
+            if numpy is not None:
+                return a.data.sum().item()
+            return sum(a.data)
+        
+        def numarray_mean(a):
+            """Arithmetic mean of all elements"""
+            a = numarray_argument(a, "NumArray.mean")
+            if len(a) == 0:
+                raise VanctionRuntimeError("NumArray.mean: array is empty", self.current_file)
+            return numarray_sum(a) / len(a)
+        
+        def numarray_dot(a, b):
+            """Dot product of two arrays of equal length"""
+            a = numarray_argument(a, "NumArray.dot")
+            b = numarray_argument(b, "NumArray.dot")
+            if len(a) != len(b):
+                raise VanctionRuntimeError(f"NumArray.dot: length mismatch: {len(a)} and {len(b)}", self.current_file)
+            if numpy is not None:
+                return numpy.dot(a.data, b.data).item()
+            return sum(map(operator.mul, a.data, b.data))
+        
+        def numarray_cumsum(a):
+            """Running totals of the elements"""
+            a = numarray_argument(a, "NumArray.cumsum")
+            dtype = 'f64' if a.dtype in FLOAT_DTYPES else 'i64'
+            if numpy is not None:
+                return NumArray(numpy.cumsum(a.data, dtype=NUMARRAY_DTYPES[dtype][1]), dtype)
+            return NumArray.build(itertools.accumulate(a.data), dtype)
+        
+        def numarray_where_func(condition, when_true, when_false):
+            """Element-wise choice: when_true where condition holds, else when_false"""
+            condition = numarray_argument(condition, "NumArray.where")
+            return numarray_where(condition, when_true, when_false)
+        
+        def numarray_to_array(a):
+            """Copy the elements into a regular array"""
+            return numarray_argument(a, "NumArray.toArray").tolist()
+        
+        self.global_env.define("NumArray.of", numarray_of)
+        self.global_env.define("NumArray.zeros", numarray_zeros)
+        self.global_env.define("NumArray.range", numarray_range)
+        self.global_env.define("NumArray.sum", numarray_sum)
+        self.global_env.define("NumArray.mean", numarray_mean)
+        self.global_env.define("NumArray.dot", numarray_dot)
+        self.global_env.define("NumArray.cumsum", numarray_cumsum)
+        self.global_env.define("NumArray.where", numarray_where_func)
+        self.global_env.define("NumArray.toArray", numarray_to_array)
+        
+        # Columnar table functions
+        def table_argument(value, name):
+            if not isinstance(value, Table):
+                raise VanctionTypeError(f"table for {name}", type_name(value), self.current_file)
+            return value
+        
+        def column_names(table, names, name):
+            """Normalize a column name or array of names, checking that each exists"""
+            names = [names] if isinstance(names, str) else list(self.iterate(names))
+            for column in names:
+                if column not in table.columns:
+                    raise VanctionRuntimeError(f"{name}: unknown column '{column}'", self.current_file)
+            return names
+        
+        def key_column(table, names):
+            """Return the row keys for one or more columns (tuples for several columns)"""
+            if len(names) == 1:
+                return column_values(table.columns[names[0]])
+            return list(zip(*(column_values(table.columns[column]) for column in names)))
+        
+        def table_from_rows(rows):
+            """Build a table from an iterable of dicts; missing fields become unassigned"""
+            rows = list(self.iterate(rows))
+            names = {}
+            for row in rows:
+                if not isinstance(row, dict):
+                    raise VanctionTypeError("dict for Table.fromRows row", type_name(row), self.current_file)
+                names.update(dict.fromkeys(row))
+            return Table({column: table_column([row.get(column) for row in rows]) for column in names}, len(rows))
+        
+        def table_from_columns(columns):
+            """Build a table from a dict of column name -> array or NumArray of equal lengths"""
+            if not isinstance(columns, dict):
+                raise VanctionTypeError("dict for Table.fromColumns", type_name(columns), self.current_file)
+            table_columns = {}
+            for column, values in columns.items():
+                table_columns[column] = values if isinstance(values, NumArray) else table_column(list(self.iterate(values)))
+            lengths = set(map(len, table_columns.values()))
+            if len(lengths) > 1:
+                raise VanctionRuntimeError(f"Table.fromColumns: columns have different lengths {sorted(lengths)}",
+                                           self.current_file)
+            return Table(table_columns, lengths.pop() if lengths else 0)
+        
+        def table_to_rows(table):
+            """Convert a table back to an array of dicts"""
+            return list(table_argument(table, "Table.toRows"))
+        
+        def table_columns(table):
+            """Names of a table's columns"""
+            return list(table_argument(table, "Table.columns").columns)
+        
+        def table_column_func(table, name):
+            """Copy of one column: a NumArray for numeric columns, otherwise an array"""
+            table = table_argument(table, "Table.column")
+            column = table.columns[column_names(table, name, "Table.column")[0]]
+            return column_take(column, range(table.length))
+        
+        def table_select(table, *names):
+            """Keep only the named columns"""
+            table = table_argument(table, "Table.select")
+            names = column_names(table, names[0] if len(names) == 1 else names, "Table.select")
+            return Table({column: table.columns[column] for column in names}, table.length)
+        
+        def table_with_column(table, name, values):
+            """Add or replace a column with an array or NumArray of the table's length"""
+            table = table_argument(table, "Table.withColumn")
+            column = values if isinstance(values, NumArray) else table_column(list(self.iterate(values)))
+            if len(column) != table.length:
+                raise VanctionRuntimeError(f"Table.withColumn: column has {len(column)} values, table has {table.length} rows",
+                                           self.current_file)
+            columns = dict(table.columns)
+            columns[name] = column
+            return Table(columns, table.length)
+        
+        def table_where(table, condition, predicate=None):
+            """Keep the rows selected by a boolean mask, a predicate over one column, or a predicate over rows
+            
+            Table.where(t, mask), Table.where(t, "column", fn) and Table.where(t, fn)
+            """
+            table = table_argument(table, "Table.where")
+            if predicate is not None:
+                column = table.columns[column_names(table, condition, "Table.where")[0]]
+                mask = map(self.fast_callable(predicate, "Table.where"), column_values(column))
+            elif isinstance(condition, (NumArray, list, ArrayView)):
+                if len(condition) != table.length:
+                    raise VanctionRuntimeError(f"Table.where: mask has {len(condition)} values, table has {table.length} rows",
+                                               self.current_file)
+                if isinstance(condition, NumArray) and numpy is not None:
+                    return table.take(numpy.flatnonzero(condition.data))
+                mask = condition
+            else:
+                mask = map(self.fast_callable(condition, "Table.where"), table)
+            return table.take(list(itertools.compress(range(table.length), map(self.is_truthy, mask))))
+        
+        def table_sort_by(table, names, reverse=False):
+            """Stable sort of the rows by one or more columns"""
+            table = table_argument(table, "Table.sortBy")
+            keys = key_column(table, column_names(table, names, "Table.sortBy"))
+            try:
+                order = sorted(range(table.length), key=keys.__getitem__, reverse=bool(reverse))
+            except TypeError:
+                raise VanctionRuntimeError("Table.sortBy: column values cannot be compared", self.current_file)
+            return table.take(order)
+        
+        def table_group_by(table, names):
+            """Group rows by the values of one or more columns, for Table.agg"""
+            table = table_argument(table, "Table.groupBy")
+            names = column_names(table, names, "Table.groupBy")
+            groups = {}
+            try:
+                ids = [groups.setdefault(key, len(groups)) for key in key_column(table, names)]
+            except TypeError:
+                raise VanctionRuntimeError("Table.groupBy: key column values must be hashable", self.current_file)
+            return TableGroups(table, names, list(groups), ids)
+        
+        def table_agg(groups, spec=None, **aggregations):
+            """Aggregate grouped rows: one output row per group
+            
+            Each aggregation is output: [kind, column], where kind is one of sum, mean,
+            min, max, count, first or last ("count" needs no column).
+            """
+            if not isinstance(groups, TableGroups):
+                raise VanctionTypeError("Table.groupBy result for Table.agg", type_name(groups), self.current_file)
+            if spec is not None:
+                if not isinstance(spec, dict):
+                    raise VanctionTypeError("dict for Table.agg", type_name(spec), self.current_file)
+                aggregations = {**spec, **aggregations}
+            table = groups.table
+            if len(groups.names) == 1:
+                columns = {groups.names[0]: table_column(list(groups.keys))}
+            else:
+                columns = {name: table_column(list(values)) for name, values in zip(groups.names, zip(*groups.keys))}
+                if not groups.keys:
+                    columns = {name: [] for name in groups.names}
+            for output, aggregation in aggregations.items():
+                aggregation = [aggregation] if isinstance(aggregation, str) else list(self.iterate(aggregation))
+                kind = aggregation[0] if aggregation else None
+                if kind not in TABLE_AGGREGATES or len(aggregation) != (1 if kind == 'count' else 2):
+                    raise VanctionRuntimeError(f"Table.agg: invalid aggregation for '{output}' "
+                                               f"(expected [kind, column] with kind one of {', '.join(TABLE_AGGREGATES)})",
+                                               self.current_file)
+                if kind == 'count':
+                    column = groups.ids
+                else:
+                    column = table.columns[column_names(table, aggregation[1], "Table.agg")[0]]
+                try:
+                    columns[output] = table_aggregate(kind, column, groups)
+                except TypeError:
+                    raise VanctionRuntimeError(f"Table.agg: cannot compute {kind} of column '{aggregation[1]}'",
+                                               self.current_file)
+            return Table(columns, len(groups.keys))
+        
+        def table_join(left, right, on, how="inner"):
+            """Hash join two tables on one or more key columns (how is "inner" or "left")
+            
+            Right-hand columns whose names clash with left-hand ones get a "_right" suffix.
+            """
+            left = table_argument(left, "Table.join")
+            right = table_argument(right, "Table.join")
+            if how not in ("inner", "left"):
+                raise VanctionRuntimeError(f"Table.join: how must be \"inner\" or \"left\", not {how!r}", self.current_file)
+            names = column_names(left, on, "Table.join")
+            column_names(right, names, "Table.join")
+            index = {}
+            try:
+                for position, key in enumerate(key_column(right, names)):
+                    index.setdefault(key, []).append(position)
+            except TypeError:
+                raise VanctionRuntimeError("Table.join: key column values must be hashable", self.current_file)
+            left_rows, right_rows = [], []
+            for position, key in enumerate(key_column(left, names)):
+                matches = index.get(key)
+                if matches:
+                    left_rows.extend(itertools.repeat(position, len(matches)))
+                    right_rows.extend(matches)
+                elif how == "left":
+                    left_rows.append(position)
+                    right_rows.append(None)
+            result = left.take(left_rows)
+            unmatched = how == "left" and None in right_rows
+            for name, column in right.columns.items():
+                if name in names:
+                    continue
+                if unmatched:
+                    values = column_values(column)
+                    column = table_column([None if row is None else values[row] for row in right_rows])
+                else:
+                    column = column_take(column, right_rows)
+                result.columns[name + "_right" if name in result.columns else name] = column
+            return result
+        
+        self.global_env.define("Table.fromRows", table_from_rows)
+        self.global_env.define("Table.fromColumns", table_from_columns)
+        self.global_env.define("Table.toRows", table_to_rows)
+        self.global_env.define("Table.columns", table_columns)
+        self.global_env.define("Table.column", table_column_func)
+        self.global_env.define("Table.select", table_select)
+        self.global_env.define("Table.withColumn", table_with_column)
+        self.global_env.define("Table.where", table_where)
+        self.global_env.define("Table.sortBy", table_sort_by)
+        self.global_env.define("Table.groupBy", table_group_by)
+        self.global_env.define("Table.agg", table_agg)
+        self.global_env.define("Table.join", table_join)
+        
+        # Collection types: hashed sets, double-ended queues, priority heaps and sorted maps
+        def collection_argument(value, kind, expected, name):
+            if not isinstance(value, kind):
+                raise VanctionTypeError(f"{expected} for {name}", type_name(value), self.current_file)
+            return value
+        
+        def hashed(function, name):
+            """Report unhashable values (arrays, dicts) as Vanction errors"""
+            try:
+                return function()
+            except TypeError:
+                raise VanctionRuntimeError(f"{name}: values must be hashable (not arrays or dicts)", self.current_file)
+        
+        def set_of(iterable=()):
+            """Create a set from the values of any iterable"""
+            return hashed(lambda: set(self.iterate(iterable)), "Set.of")
+        
+        def set_add(s, item):
+            """Add a value to a set"""
+            s = collection_argument(s, set, "set", "Set.add")
+            hashed(lambda: s.add(item), "Set.add")
+            return s
+        
+        def set_remove(s, item):
+            """Remove a value from a set if present"""
+            s = collection_argument(s, set, "set", "Set.remove")
+            hashed(lambda: s.discard(item), "Set.remove")
+            return s
+        
+        def set_has(s, item):
+            """Check whether a set contains a value"""
+            s = collection_argument(s, (set, frozenset), "set", "Set.has")
+            return hashed(lambda: item in s, "Set.has")
+        
+        def set_operation(function, name):
+            def operation(s, other):
+                s = collection_argument(s, (set, frozenset), "set", name)
+                return hashed(lambda: function(s, self.iterate(other)), name)
+            return operation
+        
+        def set_to_array(s):
+            """Copy a set's values into an array"""
+            return list(collection_argument(s, (set, frozenset), "set", "Set.toArray"))
+        
+        self.global_env.define("Set.of", set_of)
+        self.global_env.define("Set.add", set_add)
+        self.global_env.define("Set.remove", set_remove)
+        self.global_env.define("Set.has", set_has)
+        self.global_env.define("Set.union", set_operation(set.union, "Set.union"))
+        self.global_env.define("Set.intersection", set_operation(set.intersection, "Set.intersection"))
+        self.global_env.define("Set.difference", set_operation(set.difference, "Set.difference"))
+        self.global_env.define("Set.toArray", set_to_array)
+        
+        def deque_of(iterable=(), maxlen=None):
+            """Create a deque; with maxlen, pushing onto a full deque drops from the other end"""
+            if maxlen is not None and (not isinstance(maxlen, int) or isinstance(maxlen, bool) or maxlen < 0):
+                raise VanctionRuntimeError("Deque.of: maxlen must be a non-negative integer", self.current_file)
+            return deque(self.iterate(iterable), maxlen)
+        
+        def deque_push(method, name):
+            def push(d, item):
+                d = collection_argument(d, deque, "deque", name)
+                method(d, item)
+                return d
+            return push
+        
+        def deque_take(method, name):
+            def take(d):
+                d = collection_argument(d, deque, "deque", name)
+                if not d:
+                    raise VanctionRuntimeError(f"{name}: deque is empty", self.current_file)
+                return method(d)
+            return take
+        
+        self.global_env.define("Deque.of", deque_of)
+        self.global_env.define("Deque.pushBack", deque_push(deque.append, "Deque.pushBack"))
+        self.global_env.define("Deque.pushFront", deque_push(deque.appendleft, "Deque.pushFront"))
+        self.global_env.define("Deque.popBack", deque_take(deque.pop, "Deque.popBack"))
+        self.global_env.define("Deque.popFront", deque_take(deque.popleft, "Deque.popFront"))
+        self.global_env.define("Deque.peekBack", deque_take(operator.itemgetter(-1), "Deque.peekBack"))
+        self.global_env.define("Deque.peekFront", deque_take(operator.itemgetter(0), "Deque.peekFront"))
+        
+        def compared(function, name):
+            """Report values that cannot be ordered against each other as Vanction errors"""
+            try:
+                return function()
+            except TypeError:
+                raise VanctionRuntimeError(f"{name}: values cannot be compared with each other", self.current_file)
+        
+        def heap_of(iterable=(), key=None):
+            """Create a min-heap; key(item) gives the priority when supplied"""
+            key = None if key is None else self.fast_callable(key, "Heap.of")
+            return compared(lambda: Heap(self.iterate(iterable), key), "Heap.of")
+        
+        def heap_push(h, item):
+            """Add an item to a heap"""
+            h = collection_argument(h, Heap, "heap", "Heap.push")
+            compared(lambda: h.push(item), "Heap.push")
+            return h
+        
+        def heap_take(method, name):
+            def take(h):
+                h = collection_argument(h, Heap, "heap", name)
+                if not h:
+                    raise VanctionRuntimeError(f"{name}: heap is empty", self.current_file)
+                return method(h)
+            return take
+        
+        def heap_to_array(h):
+            """Copy a heap's items into an array in priority order"""
+            return list(collection_argument(h, Heap, "heap", "Heap.toArray"))
+        
+        self.global_env.define("Heap.of", heap_of)
+        self.global_env.define("Heap.push", heap_push)
+        self.global_env.define("Heap.pop", heap_take(Heap.pop, "Heap.pop"))
+        self.global_env.define("Heap.peek", heap_take(Heap.peek, "Heap.peek"))
+        self.global_env.define("Heap.toArray", heap_to_array)
+        
+        def sorted_map_of(source=None):
+            """Create a sorted map from a dict, a sorted map or an iterable of (key, value) pairs"""
+            if source is None:
+                return SortedMap()
+            if isinstance(source, (dict, SortedMap)):
+                items = source.items()
+            else:
+                items = (self.unpack_loop_item(item, ["key", "value"]) for item in self.iterate(source))
+            try:
+                return SortedMap(items)
+            except TypeError:
+                raise VanctionRuntimeError("SortedMap.of: keys must be hashable and comparable with each other",
+                                           self.current_file)
+        
+        def sorted_map_set(m, key, value):
+            """Set the value for a key"""
+            m = collection_argument(m, SortedMap, "sortedmap", "SortedMap.set")
+            hashed(lambda: m.__setitem__(key, value), "SortedMap.set")
+            return m
+        
+        def sorted_map_get(m, key, default=None):
+            """Value for a key, or default when the key is missing"""
+            m = collection_argument(m, SortedMap, "sortedmap", "SortedMap.get")
+            return hashed(lambda: m.mapping.get(key, default), "SortedMap.get")
+        
+        def sorted_map_has(m, key):
+            """Check whether a sorted map contains a key"""
+            m = collection_argument(m, SortedMap, "sortedmap", "SortedMap.has")
+            return hashed(lambda: key in m, "SortedMap.has")
+        
+        def sorted_map_remove(m, key):
+            """Remove a key if present"""
+            m = collection_argument(m, SortedMap, "sortedmap", "SortedMap.remove")
+            if hashed(lambda: key in m, "SortedMap.remove"):
+                del m[key]
+            return m
+        
+        def sorted_map_query(method, name):
+            def query(m, *args):
+                m = collection_argument(m, SortedMap, "sortedmap", name)
+                return compared(lambda: method(m, *args), name)
+            return query
+        
+        self.global_env.define("SortedMap.of", sorted_map_of)
+        self.global_env.define("SortedMap.set", sorted_map_set)
+        self.global_env.define("SortedMap.get", sorted_map_get)
+        self.global_env.define("SortedMap.remove", sorted_map_remove)
+        self.global_env.define("SortedMap.has", sorted_map_has)
+        self.global_env.define("SortedMap.first", sorted_map_query(lambda m: m.ordered[0] if m.ordered else None, "SortedMap.first"))
+        self.global_env.define("SortedMap.last", sorted_map_query(lambda m: m.ordered[-1] if m.ordered else None, "SortedMap.last"))
+        self.global_env.define("SortedMap.floor", sorted_map_query(SortedMap.floor, "SortedMap.floor"))
+        self.global_env.define("SortedMap.ceiling", sorted_map_query(SortedMap.ceiling, "SortedMap.ceiling"))
+        self.global_env.define("SortedMap.range", sorted_map_query(SortedMap.range, "SortedMap.range"))
+        self.global_env.define("SortedMap.keys", sorted_map_query(lambda m: list(m.ordered), "SortedMap.keys"))
+        self.global_env.define("SortedMap.items", sorted_map_query(lambda m: list(m.items()), "SortedMap.items"))
+        
+        # Bit set functions
+        def bitset_argument(value, name):
+            if not isinstance(value, BitSet):
+                raise VanctionTypeError(f"bitset for {name}", type_name(value), self.current_file)
+            return value
+        
+        def bitset_index(b, index, name):
+            if not isinstance(index, int) or isinstance(index, bool):
+                raise VanctionTypeError(f"integer for {name}", type_name(index), self.current_file)
+            if not 0 <= index < len(b):
+                raise VanctionIndexOutOfRangeError(index, len(b), self.current_file)
+            return index
+        
+        def bitset_create(size, fill=False):
+            """Create a bit set of size flags, all clear (or all set when fill is true)"""
+            if not isinstance(size, int) or isinstance(size, bool) or size < 0:
+                raise VanctionRuntimeError("BitSet.create: size must be a non-negative integer", self.current_file)
+            return BitSet(bytearray(b'\x01' * size if self.is_truthy(fill) else size))
+        
+        def bitset_from(iterable, size=None):
+            """Create a bit set with the given indices set; size defaults to the largest index + 1"""
+            indices = list(self.iterate(iterable))
+            for index in indices:
+                if not isinstance(index, int) or isinstance(index, bool) or index < 0:
+                    raise VanctionRuntimeError(f"BitSet.from: index must be a non-negative integer, got {index!r}",
+                                               self.current_file)
+            b = bitset_create(max(indices, default=-1) + 1 if size is None else size)
+            for index in indices:
+                b.data[bitset_index(b, index, "BitSet.from")] = 1
+            return b
+        
+        def bitset_flag(value, name):
+            def update(b, index):
+                b = bitset_argument(b, name)
+                b.data[bitset_index(b, index, name)] = value
+                return b
+            return update
+        
+        def bitset_flip(b, index):
+            """Toggle one flag"""
+            b = bitset_argument(b, "BitSet.flip")
+            index = bitset_index(b, index, "BitSet.flip")
+            b.data[index] ^= 1
+            return b
+        
+        def bitset_test(b, index):
+            """Check whether a flag is set"""
+            b = bitset_argument(b, "BitSet.test")
+            return b.data[bitset_index(b, index, "BitSet.test")] == 1
+        
+        def bitset_range(value, name):
+            def update(b, start, stop, step=1):
+                b = bitset_argument(b, name)
+                for bound in (start, stop, step):
+                    if not isinstance(bound, int) or isinstance(bound, bool):
+                        raise VanctionTypeError(f"integer for {name}", type_name(bound), self.current_file)
+                if step < 1:
+                    raise VanctionRuntimeError(f"{name}: step must be positive", self.current_file)
+                selection = slice(max(start, 0), min(stop, len(b)), step)
+                b.data[selection] = bytes([value]) * len(range(*selection.indices(len(b))))
+                return b
+            return update
+        
+        def bitset_count(b):
+            """Number of set flags"""
+            return bitset_argument(b, "BitSet.count").count()
+        
+        def bitset_combine(function, name):
+            def combine(a, b):
+                return BitSet.combine(function, bitset_argument(a, name), bitset_argument(b, name))
+            return combine
+        
+        def bitset_to_array(b):
+            """Indices of the set flags, in increasing order"""
+            return list(bitset_argument(b, "BitSet.toArray"))
+        
+        self.global_env.define("BitSet.create", bitset_create)
+        self.global_env.define("BitSet.from", bitset_from)
+        self.global_env.define("BitSet.set", bitset_flag(1, "BitSet.set"))
+        self.global_env.define("BitSet.clear", bitset_flag(0, "BitSet.clear"))
+        self.global_env.define("BitSet.flip", bitset_flip)
+        self.global_env.define("BitSet.test", bitset_test)
+        self.global_env.define("BitSet.setRange", bitset_range(1, "BitSet.setRange"))
+        self.global_env.define("BitSet.clearRange", bitset_range(0, "BitSet.clearRange"))
+        self.global_env.define("BitSet.count", bitset_count)
+        self.global_env.define("BitSet.union", bitset_combine(operator.or_, "BitSet.union"))
+        self.global_env.define("BitSet.intersection", bitset_combine(operator.and_, "BitSet.intersection"))
+        self.global_env.define("BitSet.difference", bitset_combine(lambda a, b: a ^ (a & b), "BitSet.difference"))
+        self.global_env.define("BitSet.toArray", bitset_to_array)
+        
+        # Persistent collections: updates return new versions that share structure
+        def pvector_index(v, index, name):
+            if not isinstance(index, int) or isinstance(index, bool):
+                raise VanctionTypeError(f"integer for {name}", type_name(index), self.current_file)
+            if not 0 <= index < len(v):
+                raise VanctionIndexOutOfRangeError(index, len(v), self.current_file)
+            return index
+        
+        def pvector_of(iterable=()):
+            """Create a persistent vector from the values of any iterable"""
+            return PVector.build(list(self.iterate(iterable)))
+        
+        def pvector_with(v, index, value):
+            """New vector with the element at index replaced"""
+            v = collection_argument(v, PVector, "pvector", "PVector.with")
+            return v.set(pvector_index(v, index, "PVector.with"), value)
+        
+        def pvector_push(v, value):
+            """New vector with value appended"""
+            return collection_argument(v, PVector, "pvector", "PVector.push").push(value)
+        
+        def pvector_to_array(v):
+            """Copy a persistent vector's elements into an array"""
+            return list(collection_argument(v, PVector, "pvector", "PVector.toArray"))
+        
+        self.global_env.define("PVector.of", pvector_of)
+        self.global_env.define("PVector.with", pvector_with)
+        self.global_env.define("PVector.push", pvector_push)
+        self.global_env.define("PVector.toArray", pvector_to_array)
+        
+        def pmap_of(source=None):
+            """Create a persistent map from a dict, a map or an iterable of (key, value) pairs"""
+            if source is None:
+                return PMap()
+            if isinstance(source, PMap):
+                return source
+            if isinstance(source, (dict, SortedMap)):
+                items = source.items()
+            else:
+                items = (self.unpack_loop_item(item, ["key", "value"]) for item in self.iterate(source))
+            
+            def build():
+                result = PMap()
+                for key, value in items:
+                    result = result.assoc(key, value)
+                return result
+            return hashed(build, "PMap.of")
+        
+        def pmap_assoc(m, key, value):
+            """New map with key set to value"""
+            m = collection_argument(m, PMap, "pmap", "PMap.assoc")
+            return hashed(lambda: m.assoc(key, value), "PMap.assoc")
+        
+        def pmap_dissoc(m, key):
+            """New map without key"""
+            m = collection_argument(m, PMap, "pmap", "PMap.dissoc")
+            return hashed(lambda: m.dissoc(key), "PMap.dissoc")
+        
+        def pmap_get(m, key, default=None):
+            """Value for key, or default when the key is missing"""
+            m = collection_argument(m, PMap, "pmap", "PMap.get")
+            return hashed(lambda: m.get(key, default), "PMap.get")
+        
+        def pmap_has(m, key):
+            """Check whether a persistent map contains a key"""
+            m = collection_argument(m, PMap, "pmap", "PMap.has")
+            return hashed(lambda: key in m, "PMap.has")
+        
+        self.global_env.define("PMap.of", pmap_of)
+        self.global_env.define("PMap.assoc", pmap_assoc)
+        self.global_env.define("PMap.dissoc", pmap_dissoc)
+        self.global_env.define("PMap.get", pmap_get)
+        self.global_env.define("PMap.has", pmap_has)
+        self.global_env.define("PMap.keys", lambda m: list(collection_argument(m, PMap, "pmap", "PMap.keys")))
+        self.global_env.define("PMap.toDict", lambda m: dict(collection_argument(m, PMap, "pmap", "PMap.toDict").items()))
+        
+        # Text building: a chunked builder for appends and an immutable rope for large strings
+        def string_builder_append(sb, value="", name="StringBuilder.append"):
+            """Append the text of a value to a builder"""
+            sb = collection_argument(sb, StringBuilder, "stringbuilder", name)
+            sb.append(value if isinstance(value, str) else to_text(value))
+            return sb
+        
+        self.global_env.define("StringBuilder.create", lambda text="": StringBuilder(str(text)))
+        self.global_env.define("StringBuilder.append", string_builder_append)
+        self.global_env.define("StringBuilder.appendLine",
+                               lambda sb, value="": string_builder_append(sb, str(value) + "\n", "StringBuilder.appendLine"))
+        self.global_env.define("StringBuilder.length",
+                               lambda sb: len(collection_argument(sb, StringBuilder, "stringbuilder", "StringBuilder.length")))
+        self.global_env.define("StringBuilder.toString",
+                               lambda sb: str(collection_argument(sb, StringBuilder, "stringbuilder", "StringBuilder.toString")))
+        
+        def rope_concat(*parts):
+            """Concatenate strings and ropes into a rope without copying the rope pieces"""
+            result = Rope()
+            for part in parts:
+                result = result + Rope.of(part)
+            return result
+        
+        self.global_env.define("Rope.of", Rope.of)
+        self.global_env.define("Rope.concat", rope_concat)
+        self.global_env.define("Rope.toString", lambda r: str(collection_argument(r, Rope, "rope", "Rope.toString")))
+        
+        # Binary data: read-only bytes, writable byte buffers and struct packing
+        def byte_data(value, name, encoding="utf-8"):
+            """Bytes-like object for a bytes value, a string (encoded) or an iterable of byte values"""
+            if isinstance(value, Bytes):
+                return value.view
+            if isinstance(value, str):
+                return value.encode(encoding)
+            try:
+                return bytes(list(self.iterate(value)))
+            except (TypeError, ValueError):
+                raise VanctionRuntimeError(f"{name}: expected bytes, a string or integers from 0 to 255", self.current_file)
+        
+        def bytes_of(value=(), encoding="utf-8"):
+            """Create read-only bytes from a string, an iterable of byte values or other bytes"""
+            if isinstance(value, Bytes) and not value.writable:
+                return value
+            data = byte_data(value, "Bytes.of", encoding)
+            return Bytes(data.tobytes() if isinstance(data, memoryview) else data)
+        
+        def byte_buffer_create(source=0):
+            """Create a writable buffer of size zero bytes, or a writable copy of source"""
+            if isinstance(source, int) and not isinstance(source, bool):
+                if source < 0:
+                    raise VanctionRuntimeError("ByteBuffer.create: size must be a non-negative integer", self.current_file)
+                return Bytes(bytearray(source))
+            return Bytes(bytearray(byte_data(source, "ByteBuffer.create")))
+        
+        def bytes_decode(b, encoding="utf-8"):
+            """Decode bytes into a string"""
+            b = collection_argument(b, Bytes, "bytes", "Bytes.decode")
+            try:
+                return str(b.view, encoding)
+            except (UnicodeDecodeError, LookupError) as e:
+                raise VanctionRuntimeError(f"Bytes.decode: {e}", self.current_file)
+        
+        def struct_call(name, function, *args):
+            try:
+                return function(*args)
+            except struct.error as e:
+                raise VanctionRuntimeError(f"{name}: {e}", self.current_file)
         
-        def str_upper(s):
-            """Convert string to uppercase"""
-            if not isinstance(s, str):
-                raise VanctionRuntimeError("str.upper: argument must be a string", self.current_file)
-            return s.upper()
+        def unpacked(values):
+            return tuple(Bytes(value) if isinstance(value, bytes) else value for value in values)
         
-        def str_startswith(s, prefix):
-            """Check if string starts with prefix"""
-            if not isinstance(s, str):
-                raise VanctionRuntimeError("str.startswith: first argument must be a string", self.current_file)
-            if not isinstance(prefix, str):
-                prefix = str(prefix)
-            return s.startswith(prefix)
+        def bytes_pack(format, *values):
+            """Pack values into bytes following a struct format such as "<IHd" """
+            values = [value.view.tobytes() if isinstance(value, Bytes) else
+                      value.encode('utf-8') if isinstance(value, str) else value for value in values]
+            return Bytes(struct_call("Bytes.pack", struct.pack, format, *values))
         
-        def str_endswith(s, suffix):
-            """Check if string ends with suffix"""
-            if not isinstance(s, str):
-                raise VanctionRuntimeError("str.endswith: first argument must be a string", self.current_file)
-            if not isinstance(suffix, str):
-                suffix = str(suffix)
-            return s.endswith(suffix)
+        def bytes_unpack(format, b, offset=0):
+            """Read one tuple of values at offset following a struct format, without copying"""
+            b = collection_argument(b, Bytes, "bytes", "Bytes.unpack")
+            return unpacked(struct_call("Bytes.unpack", struct.unpack_from, format, b.view, offset))
         
-        def str_substring(s, start, end=None):
-            """Return substring from start to end"""
-            if not isinstance(s, str):
-                raise VanctionRuntimeError("str.substring: first argument must be a string", self.current_file)
-            if not isinstance(start, int):
-                raise VanctionRuntimeError("str.substring: start must be an integer", self.current_file)
-            if end is not None and not isinstance(end, int):
-                raise VanctionRuntimeError("str.substring: end must be an integer", self.current_file)
-            return s[start:end]
+        def bytes_unpack_all(format, b):
+            """Lazily read consecutive records following a struct format"""
+            b = collection_argument(b, Bytes, "bytes", "Bytes.unpackAll")
+            records = struct_call("Bytes.unpackAll", struct.iter_unpack, format, b.view)
+            return (unpacked(values) for values in records)
         
-        def str_find(s, substring, start=0, end=None):
-            """Find substring in string"""
-            if not isinstance(s, str):
-                raise VanctionRuntimeError("str.find: first argument must be a string", self.current_file)
-            if not isinstance(substring, str):
-                substring = str(substring)
-            if not isinstance(start, int):
-                raise VanctionRuntimeError("str.find: start must be an integer", self.current_file)
-            if end is not None and not isinstance(end, int):
-                raise VanctionRuntimeError("str.find: end must be an integer", self.current_file)
-            return s.find(substring, start, end)
+        self.global_env.define("Bytes.of", bytes_of)
+        self.global_env.define("ByteBuffer.create", byte_buffer_create)
+        self.global_env.define("Bytes.decode", bytes_decode)
+        self.global_env.define("Bytes.hex", lambda b: collection_argument(b, Bytes, "bytes", "Bytes.hex").view.hex())
+        self.global_env.define("Bytes.concat", lambda *parts: Bytes(b''.join(byte_data(part, "Bytes.concat") for part in parts)))
+        self.global_env.define("Bytes.toArray", lambda b: collection_argument(b, Bytes, "bytes", "Bytes.toArray").view.tolist())
+        self.global_env.define("Bytes.pack", bytes_pack)
+        self.global_env.define("Bytes.unpack", bytes_unpack)
+        self.global_env.define("Bytes.unpackAll", bytes_unpack_all)
+        self.global_env.define("Bytes.size", lambda format: struct_call("Bytes.size", struct.calcsize, format))
         
-        # Register string operation functions
-        self.global_env.define("str.contains", str_contains)
-        self.global_env.define("str.replace", str_replace)
-        self.global_env.define("str.split", str_split)
-        self.global_env.define("str.strip", str_strip)
-        self.global_env.define("str.lower", str_lower)
-        self.global_env.define("str.upper", str_upper)
-        self.global_env.define("str.startswith", str_startswith)
-        self.global_env.define("str.endswith", str_endswith)
-        self.global_env.define("str.substring", str_substring)
-        self.global_env.define("str.find", str_find)
+        def bigint_digits(n):
+            """Number of decimal digits of an integer (ignoring the sign), without converting it to text"""
+            if not isinstance(n, int) or isinstance(n, bool):
+                raise VanctionTypeError("integer for BigInt.digits", type_name(n), self.current_file)
+            return decimal_digit_count(n)
+        
+        self.global_env.define("BigInt.digits", bigint_digits)
     
     def interpret(self, program: Program, filename: str = ""):
         self.current_file = filename
@@ -693,36 +3643,214 @@ class Interpreter:
     def print_runtime_error(self, error: VanctionRuntimeError):
         """Print runtime error with file, line, and column information"""
         # Directly print error object, as it already contains complete formatted information
+        self.output.flush()
         print(error)
     
     def execute_function(self, func: FunctionDef, arguments: List[Any], current_env: Environment = None) -> Any:
         """Execute function definition"""
+        if func.memo:
+            cache = getattr(func, 'memo_cache', None)
+            if cache is None:
+                cache = func.memo_cache = MemoCache()
+            return cache.call(lambda: self.invoke_function(func, arguments, current_env), tuple(arguments))
+        return self.invoke_function(func, arguments, current_env)
+    
+    def invoke_function(self, func: FunctionDef, arguments: List[Any], current_env: Environment = None) -> Any:
+        """Run a function body with arguments bound in a new local environment"""
         # Create new local environment
-        # Use current_env as parent for nested functions
-        parent_env = current_env if current_env else self.global_env
+        # Nested functions run in the scope they were defined in, otherwise current_env is the parent
+        parent_env = getattr(func, 'closure_env', None) or current_env or self.global_env
         function_env = Environment(parent=parent_env)
         
         # Bind parameters
         if len(arguments) != len(func.parameters):
             raise VanctionFunctionCallError(f"Function '{func.name}' expects {len(func.parameters)} arguments, got {len(arguments)}")
         
+        if not getattr(func, 'specialized', False):
+            self.specialize_function(func)
+        
+        # Verify annotated parameter types at function entry
+        if func.parameter_types:
+            for param, arg in zip(func.parameters, arguments):
+                if param in func.parameter_types:
+                    self.check_type(arg, func.parameter_types[param], f"parameter '{param}' of '{func.name}'", func)
+        
         for param, arg in zip(func.parameters, arguments):
             function_env.define(param, arg)
         
+        # Generator functions run lazily, one yield at a time
+        if func.generator:
+            return VanctionGenerator(func.name, self.run_generator(func, function_env))
+        
         # Execute function body
         try:
             for stmt in func.body:
                 self.execute_statement(stmt, function_env)
-            return None  # Default return value
+            result = None  # Default return value
         except ReturnException as e:
-            return e.value
+            result = e.value
+        
+        # Lambdas made here share this frame; keep only the locals they read
+        captured = getattr(function_env, 'captured_names', None)
+        if captured is not None and not getattr(function_env, 'pinned', False):
+            function_env.keep_only(captured)
+        
+        if func.return_type:
+            self.check_type(result, func.return_type, f"return value of '{func.name}'", func)
+        return result
+    
+    def run_generator(self, func: FunctionDef, function_env: Environment):
+        """Run a generator function body, producing the value of each yield as it is reached"""
+        try:
+            for value in self.execute_statements_yielding(func.body, function_env):
+                if func.return_type:
+                    self.check_type(value, func.return_type, f"value yielded by '{func.name}'", func)
+                yield value
+        except ReturnException:
+            return
+    
+    def execute_statements_yielding(self, statements: List[Statement], env: Environment):
+        """Execute statements inside a generator function, yielding at each yield statement
+        
+        Statements that contain no yield are run by execute_statement as usual.
+        """
+        for statement in statements:
+            yields = getattr(statement, 'yields', None)
+            if yields is None:
+                yields = statement.yields = contains_yield([statement])
+            if yields:
+                yield from self.execute_statement_yielding(statement, env)
+            else:
+                self.execute_statement(statement, env)
+    
+    def execute_statement_yielding(self, statement: Statement, env: Environment):
+        """Execute one statement that contains a yield, suspending at each yield"""
+        if isinstance(statement, YieldStatement):
+            yield self.evaluate_expression(statement.value, env) if statement.value else None
+        
+        elif isinstance(statement, IfStatement):
+            if self.is_truthy(self.evaluate_expression(statement.condition, env)):
+                yield from self.execute_statements_yielding(statement.then_body, env)
+            elif statement.else_body:
+                yield from self.execute_statements_yielding(statement.else_body, env)
+        
+        elif isinstance(statement, WhileStatement):
+            while self.is_truthy(self.evaluate_expression(statement.condition, env)):
+                try:
+                    yield from self.execute_statements_yielding(statement.body, env)
+                except BreakException:
+                    break
+                except ContinueException:
+                    continue
+        
+        elif isinstance(statement, ForStatement):
+            if statement.variable and statement.iterable:
+                names = statement.variables or [statement.variable]
+                iterator = self.iterate(self.evaluate_expression(statement.iterable, env), len(names))
+                for item in iterator:
+                    loop_env = Environment(parent=env)
+                    if len(names) == 1:
+                        loop_env.define(names[0], item)
+                    else:
+                        for loop_name, value in zip(names, self.unpack_loop_item(item, names)):
+                            loop_env.define(loop_name, value)
+                    try:
+                        yield from self.execute_statements_yielding(statement.body, loop_env)
+                    except BreakException:
+                        break
+                    except ContinueException:
+                        continue
+            else:
+                if statement.init:
+                    self.evaluate_expression(statement.init, env)
+                while not statement.condition or self.is_truthy(self.evaluate_expression(statement.condition, env)):
+                    try:
+                        yield from self.execute_statements_yielding(statement.body, env)
+                    except BreakException:
+                        break
+                    except ContinueException:
+                        pass
+                    if statement.update:
+                        self.evaluate_expression(statement.update, env)
+        
+        elif isinstance(statement, SwitchStatement):
+            switch_value = self.evaluate_expression(statement.expression, env)
+            body = statement.default_case
+            for case in statement.cases:
+                if switch_value == self.evaluate_expression(case.value, env):
+                    body = case.body
+                    break
+            if body:
+                try:
+                    yield from self.execute_statements_yielding(body, env)
+                except BreakException:
+                    pass
+        
+        elif isinstance(statement, TryStatement):
+            closing = False
+            try:
+                try:
+                    yield from self.execute_statements_yielding(statement.try_body, env)
+                except Exception as e:
+                    catch_env = self.catch_environment(statement, e, env)
+                    if catch_env is not None:
+                        yield from self.execute_statements_yielding(statement.catch_body, catch_env)
+            except GeneratorExit:
+                closing = True
+                raise
+            finally:
+                if statement.finally_body:
+                    finally_steps = self.execute_statements_yielding(statement.finally_body, env)
+                    if closing:
+                        # The generator was abandoned (break, or a partly used next): nothing can
+                        # receive values any more, so run finally to the end and drop its yields
+                        for _ in finally_steps:
+                            pass
+                    else:
+                        yield from finally_steps
+        
+        else:
+            self.execute_statement(statement, env)
+    
+    def specialize_function(self, func: FunctionDef):
+        """Select numeric fast paths from the function's type annotations (once per definition)"""
+        numeric_names = {param for param, type_annotation in func.parameter_types.items()
+                         if type_annotation in NUMERIC_TYPES}
+        specialize_numeric(func.body, numeric_names)
+        func.specialized = True
+    
+    def check_type(self, value: Any, type_annotation: str, description: str, node=None):
+        """Raise VanctionTypeError if value does not match a type annotation"""
+        check = TYPE_CHECKS.get(type_annotation)
+        if check is None:
+            record_type = self.record_types.get(type_annotation)
+            if record_type is None:
+                raise VanctionRuntimeError(f"Unknown type annotation '{type_annotation}' for {description}",
+                                           self.current_file, getattr(node, 'line', 0), getattr(node, 'column', 0))
+            check = lambda candidate: isinstance(candidate, record_type)
+        if not check(value):
+            raise VanctionTypeError(f"{type_annotation} for {description}", type_name(value),
+                                    self.current_file, getattr(node, 'line', 0), getattr(node, 'column', 0))
     
     def execute_statement(self, statement: Statement, env: Environment):
         """Execute statement"""
         # Handle function definitions first
         if isinstance(statement, FunctionDef):
+            if env is not self.global_env:
+                # A nested definition is bound to this scope: it runs there and has its own memo cache
+                statement = copy.copy(statement)
+                statement.closure_env = env
+                statement.memo_cache = None
+                # It keeps the whole scope chain, so no enclosing frame may drop its locals
+                scope = env
+                while scope is not self.global_env:
+                    scope.pinned = True
+                    scope = scope.parent
             env.define_function(statement.name, statement)
             return
+        elif isinstance(statement, RecordDef):
+            env.define(statement.name, self.record_constructor(statement))
+            return
         elif isinstance(statement, ExpressionStatement):
             expr = statement.expression
             # Handle assignment expressions
@@ -777,28 +3905,111 @@ class Interpreter:
         else:
             raise VanctionRuntimeError(f"Unknown statement type: {type(statement)}", self.current_file)
     
+    def record_constructor(self, statement: RecordDef) -> Callable:
+        """Create the record type for a record declaration and return its constructor
+        
+        The constructor takes the fields in order, by name (Point(y: 2, x: 1)) or both, and
+        checks any field type annotations.
+        """
+        name = statement.name
+        fields = tuple(statement.fields)
+        for field in fields:
+            # Underscore names are reserved for the record machinery (_fields, _values, ...)
+            if field.startswith('_'):
+                raise VanctionRuntimeError(f"Record {name}: field name '{field}' cannot start with '_'",
+                                           self.current_file, getattr(statement, 'line', 0),
+                                           getattr(statement, 'column', 0))
+        field_types = statement.field_types
+        record_type = type(name, (Record,), {'__slots__': fields, '_fields': fields})
+        self.record_types[name] = record_type
+        
+        def construct(*args, **kwargs):
+            values = list(args)
+            if kwargs:
+                values.extend(itertools.repeat(_MISSING, len(fields) - len(values)))
+                for field, value in kwargs.items():
+                    if field not in fields:
+                        raise VanctionFunctionCallError(f"{name} has no field '{field}'", self.current_file)
+                    position = fields.index(field)
+                    if position < len(args):
+                        raise VanctionFunctionCallError(f"{name}: field '{field}' given twice", self.current_file)
+                    values[position] = value
+            given = sum(value is not _MISSING for value in values)
+            if len(values) != len(fields) or given != len(fields):
+                raise VanctionFunctionCallError(f"{name} expects {len(fields)} fields ({', '.join(fields)}), got {given}",
+                                                self.current_file)
+            for field, annotation in field_types.items():
+                self.check_type(values[fields.index(field)], annotation, f"field '{field}' of {name}", statement)
+            return record_type(*values)
+        
+        construct.record_type = record_type
+        return construct
+    
+    def field_value(self, obj: Any, name: str, node) -> Any:
+        """Read a record field (or a dictionary entry) for p.x style access"""
+        if isinstance(obj, Record):
+            if name in obj._fields:
+                return getattr(obj, name)
+            raise VanctionUndefinedError(f"{type(obj).__name__}.{name}", "field",
+                                         self.current_file, getattr(node, 'line', 0), getattr(node, 'column', 0))
+        if isinstance(obj, dict):
+            if name in obj:
+                return obj[name]
+            raise VanctionKeyNotFoundError(name, self.current_file, getattr(node, 'line', 0), getattr(node, 'column', 0))
+        raise VanctionRuntimeError(f"Cannot read field '{name}' of {type_name(obj)}",
+                                   self.current_file, getattr(node, 'line', 0), getattr(node, 'column', 0))
+    
     def execute_for_statement(self, statement: ForStatement, env: Environment):
         """Execute for loop statement"""
         if statement.variable and statement.iterable:
-            # for (item in collection) syntax
+            # for (item in collection) / for (key, value in collection) syntax
             iterable = self.evaluate_expression(statement.iterable, env)
+            names = statement.variables or [statement.variable]
+            iterator = self.iterate(iterable, len(names))
             
-            # Ensure iterable is iterable
-            if isinstance(iterable, list):
-                for item in iterable:
-                    # Create new local environment to avoid polluting external scope
-                    loop_env = Environment(parent=env)
-                    loop_env.define(statement.variable, item)
+            single = len(names) == 1
+            name = names[0]
+            body = statement.body
+            
+            # A lambda that reads a loop variable or a name the body binds shares the loop frame,
+            # so such a body gets a fresh frame per iteration
+            fresh_binding = getattr(statement, 'captures_loop_scope', None)
+            if fresh_binding is None:
+                captured = set().union(*map(lambda_free_names, body))
+                fresh_binding = bool(captured) and not captured.isdisjoint(set(names) | bound_names(body))
+                statement.captures_loop_scope = fresh_binding
+            
+            # Otherwise reuse a single loop frame and rebind the variables in place
+            loop_env = Environment(parent=env)
+            variables = loop_env.variables
+            try:
+                for item in iterator:
+                    if fresh_binding:
+                        loop_env = Environment(parent=env)
+                        if single:
+                            loop_env.define(name, item)
+                        else:
+                            for loop_name, value in zip(names, self.unpack_loop_item(item, names)):
+                                loop_env.define(loop_name, value)
+                    else:
+                        # Drop anything the previous iteration declared in the loop scope
+                        if len(variables) > len(names) or loop_env.constants or loop_env.functions:
+                            variables.clear()
+                            loop_env.constants.clear()
+                            loop_env.functions.clear()
+                        if single:
+                            variables[name] = AnytionType() if item is None else item
+                        else:
+                            for loop_name, value in zip(names, self.unpack_loop_item(item, names)):
+                                variables[loop_name] = AnytionType() if value is None else value
                     
                     try:
-                        for stmt in statement.body:
+                        for stmt in body:
                             self.execute_statement(stmt, loop_env)
-                    except BreakException:
-                        break
                     except ContinueException:
                         continue
-            else:
-                raise VanctionRuntimeError(f"Object is not iterable: {type(iterable)}", self.current_file)
+            except BreakException:
+                pass
         else:
             # Traditional for (init; condition; update) syntax
             # Execute initialization
@@ -826,80 +4037,38 @@ class Interpreter:
                 if statement.update:
                     self.evaluate_expression(statement.update, env)
     
+    def iterate(self, iterable: Any, target_count: int = 1):
+        """Return a Python iterator over any iterable Vanction value without copying it
+        
+        Dictionaries and sorted and persistent maps yield keys, or (key, value) pairs when unpacked
+        into two targets.
+        """
+        if isinstance(iterable, (dict, SortedMap, PMap)) and target_count > 1:
+            return iter(iterable.items())
+        try:
+            return iter(iterable)
+        except TypeError:
+            raise VanctionRuntimeError(f"Object is not iterable: {type(iterable)}", self.current_file)
+    
+    def unpack_loop_item(self, item: Any, names: List[str]):
+        """Split one iteration value across several loop variables"""
+        try:
+            values = tuple(item)
+        except TypeError:
+            raise VanctionRuntimeError(f"Cannot unpack {type_name(item)} into {len(names)} loop variables", self.current_file)
+        if len(values) != len(names):
+            raise VanctionRuntimeError(f"Cannot unpack {len(values)} values into {len(names)} loop variables", self.current_file)
+        return values
+    
     def execute_try_statement(self, statement: TryStatement, env: Environment):
         """Execute try-catch-finally statement"""
         try:
             # Execute try block
             for stmt in statement.try_body:
                 self.execute_statement(stmt, env)
-        except VanctionException as e:
-            # Catch Vanction exceptions (user-defined exceptions)
-            if statement.catch_body:
-                # Check exception type filtering (if exception type is specified)
-                if statement.exception_type and e.exception_type != statement.exception_type:
-                    # Type mismatch, re-throw exception
-                    raise
-                
-                # Create new environment to handle exception variable
-                catch_env = Environment(parent=env)
-                
-                # If there is exception variable, store exception information to variable
-                if statement.exception_var:
-                    catch_env.define(statement.exception_var, {
-                        'type': e.exception_type,
-                        'message': e.message
-                    })
-                
-                # Execute catch block
-                for stmt in statement.catch_body:
-                    self.execute_statement(stmt, catch_env)
-        except VanctionRuntimeError as e:
-            # Catch Vanction runtime errors (like division by zero, array out of bounds, etc.)
-            if statement.catch_body:
-                # Check exception type filtering
-                exception_matches = True
-                if statement.exception_type:
-                    # Get exception class name as type
-                    actual_type = type(e).__name__
-                    if actual_type != statement.exception_type:
-                        # Type mismatch, re-throw exception
-                        exception_matches = False
-                        raise
-                
-                # Create new environment to handle exception variable
-                catch_env = Environment(parent=env)
-                
-                if statement.exception_var:
-                    # 提取简单的错误消息，不包含堆栈跟踪
-                    simple_message = str(e)
-                    if "Runtime Error: " in simple_message:
-                        simple_message = simple_message.split("Runtime Error: ")[-1]
-                    catch_env.define(statement.exception_var, {
-                        'type': type(e).__name__,
-                        'message': simple_message
-                    })
-                
-                # Execute catch block
-                for stmt in statement.catch_body:
-                    self.execute_statement(stmt, catch_env)
         except Exception as e:
-            # Catch other unexpected exceptions
-            if statement.catch_body:
-                # Check exception type filtering
-                if statement.exception_type:
-                    # Only catch when no specific type is specified
-                    if statement.exception_type != "RuntimeError":
-                        raise
-                
-                # Create new environment to handle exception variable
-                catch_env = Environment(parent=env)
-                
-                if statement.exception_var:
-                    catch_env.define(statement.exception_var, {
-                        'type': 'RuntimeError',
-                        'message': str(e)
-                    })
-                
+            catch_env = self.catch_environment(statement, e, env)
+            if catch_env is not None:
                 # Execute catch block
                 for stmt in statement.catch_body:
                     self.execute_statement(stmt, catch_env)
@@ -909,6 +4078,44 @@ class Interpreter:
                 for stmt in statement.finally_body:
                     self.execute_statement(stmt, env)
     
+    def catch_environment(self, statement: TryStatement, error: Exception, env: Environment) -> Optional[Environment]:
+        """Build the environment for the catch block handling error (None if there is no catch block)
+        
+        Re-raises the error when the catch clause names a different exception type.
+        """
+        if not statement.catch_body:
+            return None
+        
+        if isinstance(error, VanctionException):
+            # Vanction exceptions (user-defined exceptions)
+            error_type = error.exception_type
+            message = error.message
+        elif isinstance(error, VanctionRuntimeError):
+            # Vanction runtime errors (like division by zero, array out of bounds, etc.)
+            error_type = type(error).__name__
+            # 提取简单的错误消息，不包含堆栈跟踪
+            message = str(error)
+            if "Runtime Error: " in message:
+                message = message.split("Runtime Error: ")[-1]
+        else:
+            # Other unexpected exceptions
+            error_type = 'RuntimeError'
+            message = str(error)
+        
+        # Check exception type filtering (if exception type is specified)
+        if statement.exception_type and statement.exception_type != error_type:
+            # Type mismatch, re-throw exception
+            raise error
+        
+        # Create new environment to handle exception variable
+        catch_env = Environment(parent=env)
+        if statement.exception_var:
+            catch_env.define(statement.exception_var, {
+                'type': error_type,
+                'message': message
+            })
+        return catch_env
+    
     def execute_throw_statement(self, statement: ThrowStatement, env: Environment):
         """Execute throw statement"""
         if statement.expression:
@@ -1017,6 +4224,10 @@ class Interpreter:
                         name=func_name,
                         parameters=func.parameters,
                         body=func.body,
+                        parameter_types=func.parameter_types,
+                        return_type=func.return_type,
+                        memo=func.memo,
+                        generator=func.generator,
                         line=func.line,
                         column=func.column
                     )
@@ -1069,6 +4280,9 @@ class Interpreter:
                 return result
             return expr.value
         
+        elif isinstance(expr, FormatStringExpression):
+            return self.evaluate_format_parts(expr.parts, env)
+        
         elif isinstance(expr, Identifier):
             value = env.get(expr.name)
             # Check if value is of type AnytionType
@@ -1106,8 +4320,10 @@ class Interpreter:
                 if isinstance(expr.left, Identifier):
                     var_name = expr.left.name
                     value = self.evaluate_expression(expr.right, env)
+                    if expr.type_annotation:
+                        self.check_type(value, expr.type_annotation, f"variable '{var_name}'", expr)
                     # Check if variable exists without getting its value (to avoid anytion error)
-                    if env.has_variable(var_name):
+                    if env.has_variable(var_name) and not self.shadows_builtin(var_name, env):
                         # Variable exists, update it
                         env.set(var_name, value, self.current_file, getattr(expr, 'line', 0), getattr(expr, 'column', 0))
                     else:
@@ -1116,54 +4332,27 @@ class Interpreter:
                         is_constant = getattr(expr, 'is_constant', False)
                         env.define(var_name, value, is_constant)
                     return value
+                elif isinstance(expr.left, (IndexExpression, MemberExpression)):
+                    # In-place store: a[i] = v, d["k"] = v, grid[r][c] = v, config.key = v
+                    value = self.evaluate_expression(expr.right, env)
+                    container, key = self.assignment_target(expr.left, env)
+                    container[key] = value
+                    return value
                 else:
                     raise VanctionRuntimeError(f"Invalid assignment target: {type(expr.left)}", self.current_file)
             
             left = self.evaluate_expression(expr.left, env)
             right = self.evaluate_expression(expr.right, env)
             
-            # Check for anytion values - only for non-assignment operations
-            if expr.operator != '=' and (isinstance(left, AnytionType) or isinstance(right, AnytionType)):
-                raise VanctionAnytionError(self.current_file, getattr(expr, 'line', 0), getattr(expr, 'column', 0))
-            
-            # Check for unassigned values (None)
-            if left is None or right is None:
-                raise VanctionUnassignedError(self.current_file, getattr(expr, 'line', 0), getattr(expr, 'column', 0))
+            # Operands proven numeric by type annotations skip the generic checks
+            fast_op = expr.fast_op
+            if fast_op is not None:
+                try:
+                    return fast_op(left, right)
+                except (TypeError, ZeroDivisionError):
+                    pass  # Let the generic path report the error
             
-            if expr.operator == '+':
-                return left + right
-            elif expr.operator == '-':
-                return left - right
-            elif expr.operator == '*':
-                return left * right
-            elif expr.operator == '/':
-                if right == 0:
-                    raise VanctionDivisionByZeroError(self.current_file, getattr(expr, 'line', 0), getattr(expr, 'column', 0))
-                return left / right
-            elif expr.operator == '%':
-                if right == 0:
-                    raise VanctionDivisionByZeroError(self.current_file, getattr(expr, 'line', 0), getattr(expr, 'column', 0))
-                return left % right
-            elif expr.operator == '^':
-                return left ** right
-            elif expr.operator == '==':
-                return left == right
-            elif expr.operator == '!=':
-                return left != right
-            elif expr.operator == '<':
-                return left < right
-            elif expr.operator == '>':
-                return left > right
-            elif expr.operator == '<=':
-                return left <= right
-            elif expr.operator == '>=':
-                return left >= right
-            elif expr.operator == '&&':
-                return self.is_truthy(left) and self.is_truthy(right)
-            elif expr.operator == '||':
-                return self.is_truthy(left) or self.is_truthy(right)
-            else:
-                raise VanctionRuntimeError(f"Unknown binary operator: {expr.operator}", self.current_file)
+            return self.apply_binary_operator(expr, left, right)
         
         elif isinstance(expr, MultiAssignmentExpression):
             # Evaluate the right-hand side expression
@@ -1174,7 +4363,7 @@ class Interpreter:
                 raise VanctionAnytionError(self.current_file, getattr(expr, 'line', 0), getattr(expr, 'column', 0))
             
             # Convert single value to list for consistent handling
-            if not isinstance(value, (list, tuple)):
+            if not isinstance(value, (list, tuple, ArrayView)):
                 value_list = [value] * len(expr.variables)
             else:
                 value_list = list(value)
@@ -1187,6 +4376,9 @@ class Interpreter:
             for var, val in zip(expr.variables, value_list):
                 var_name = var.name
                 # If variable exists, use set to update; otherwise use define to create
+                if self.shadows_builtin(var_name, env):
+                    env.define(var_name, val)
+                    continue
                 try:
                     env.set(var_name, val, self.current_file, getattr(var, 'line', 0), getattr(var, 'column', 0))
                 except VanctionImmutableError:
@@ -1202,6 +4394,18 @@ class Interpreter:
             # Handle member access like test_module.hello or module.var
             obj_name = expr.object
             member_name = expr.property
+            
+            # Record fields (p.x, segment.start.x) are read straight from the record's slots
+            root_name = obj_name.split('.', 1)[0] if '.' in obj_name else obj_name
+            owner = env.resolve(root_name)
+            if owner is not None:
+                obj = owner.constants[root_name] if root_name in owner.constants else owner.variables.get(root_name)
+                if isinstance(obj, Record):
+                    if obj_name is not root_name:
+                        for name in obj_name.split('.')[1:]:
+                            obj = self.field_value(obj, name, expr)
+                    return self.field_value(obj, member_name, expr)
+            
             full_name = f"{obj_name}.{member_name}"
                         
             # First, try to get the full name directly from current environment
@@ -1252,17 +4456,20 @@ class Interpreter:
                 key_val = self.evaluate_expression(key_expr, env)
                 value_val = self.evaluate_expression(value_expr, env)
                 # Ensure key is hashable type
-                if not isinstance(key_val, (int, float, str, bool, type(None))):
+                if not isinstance(key_val, DICT_KEY_TYPES):
                     raise VanctionRuntimeError(f"Dictionary key must be a hashable type, got {type(key_val).__name__}", self.current_file)
                 result[key_val] = value_val
             return result
         
+        elif isinstance(expr, ComprehensionExpression):
+            return self.evaluate_comprehension(expr, env)
+        
         elif isinstance(expr, IndexExpression):
             obj = self.evaluate_expression(expr.object, env)
             index = self.evaluate_expression(expr.index, env)
             
-            if isinstance(obj, str):
-                # String index access
+            if isinstance(obj, (str, Rope)):
+                # String (or rope) index access
                 if isinstance(index, int):
                     if 0 <= index < len(obj):
                         return obj[index]
@@ -1271,8 +4478,8 @@ class Interpreter:
                 else:
                     raise VanctionTypeError("integer", type(index).__name__)
             
-            elif isinstance(obj, list):
-                # List index access
+            elif isinstance(obj, (list, range, ArrayView, NumArray, deque, BitSet, PVector, Bytes)):
+                # List (or lazy range, array view, NumArray, deque, bit set, persistent vector or bytes) index access
                 if isinstance(index, int):
                     if 0 <= index < len(obj):
                         return obj[index]
@@ -1281,8 +4488,8 @@ class Interpreter:
                 else:
                     raise VanctionTypeError("integer", type(index).__name__)
             
-            elif isinstance(obj, dict):
-                # Dictionary index access
+            elif isinstance(obj, (dict, SortedMap, PMap)):
+                # Dictionary (or sorted or persistent map) index access
                 if index in obj:
                     return obj[index]
                 else:
@@ -1301,30 +4508,409 @@ class Interpreter:
             else:
                 raise VanctionRuntimeError(f"Cannot index object of type {type(obj).__name__}", self.current_file)
         
+        elif isinstance(expr, SliceExpression):
+            return self.evaluate_slice(expr, env)
+        
+        elif isinstance(expr, FieldExpression):
+            return self.field_value(self.evaluate_expression(expr.object, env), expr.property, expr)
+        
+        elif isinstance(expr, AugmentedAssignment):
+            return self.evaluate_augmented_assignment(expr, env)
+        
         elif isinstance(expr, TupleExpression):
             return tuple(self.evaluate_expression(elem, env) for elem in expr.elements)
         
         elif isinstance(expr, LambdaExpression):
-            # Create anonymous function
-            def lambda_func(*args):
-                # Create new local environment
-                lambda_env = Environment(parent=env)
-                
-                # Bind parameters
-                if len(args) != len(expr.parameters):
-                    raise VanctionFunctionCallError(f"Lambda function expects {len(expr.parameters)} arguments, got {len(args)}")
-                
-                for param, arg in zip(expr.parameters, args):
-                    lambda_env.define(param, arg)
-                
-                # Execute lambda body
-                return self.evaluate_expression(expr.body, lambda_env)
-            
-            return lambda_func
+            return self.make_lambda(expr, env)
         
         else:
             raise VanctionRuntimeError(f"Unknown expression type: {type(expr)}", self.current_file)
     
+    def evaluate_augmented_assignment(self, expr: AugmentedAssignment, env: Environment) -> Any:
+        """Evaluate x += v, a[i] -= v, x++ and friends, resolving the target binding only once"""
+        target = expr.target
+        if isinstance(target, Identifier):
+            name = target.name
+            owner = env.resolve(name)
+            if owner is None:
+                raise VanctionUndefinedError(name, "variable")
+            if name in owner.constants:
+                raise VanctionImmutableError(name, self.current_file, getattr(expr, 'line', 0), getattr(expr, 'column', 0))
+            if name not in owner.variables:
+                raise VanctionRuntimeError(f"Cannot assign to function '{name}'", self.current_file)
+            container, key = owner.variables, name
+        else:
+            container, key = self.assignment_target(target, env)
+        
+        try:
+            current = container[key]
+        except KeyError:
+            raise VanctionKeyNotFoundError(str(key))
+        new_value = self.apply_binary_operator(expr, current, self.evaluate_expression(expr.value, env))
+        container[key] = new_value
+        return current if expr.postfix else new_value
+    
+    def assignment_target(self, target: Expression, env: Environment):
+        """Evaluate an index or member assignment target to a (container, key) pair ready for storing
+        
+        Raises the same errors as reading the element would, and VanctionImmutableError if the
+        target belongs to an immut or define binding.
+        """
+        line, column = getattr(target, 'line', 0), getattr(target, 'column', 0)
+        
+        # The root variable of the target decides immutability: immut a = [...]; a[0] = 1 is an error
+        root = target
+        while isinstance(root, IndexExpression):
+            root = root.object
+        if isinstance(root, Identifier):
+            root_name = root.name
+        elif isinstance(root, MemberExpression):
+            root_name = root.object.split('.', 1)[0]
+        else:
+            root_name = None
+        if root_name is not None:
+            owner = env.resolve(root_name)
+            if owner is not None and root_name in owner.constants:
+                raise VanctionImmutableError(root_name, self.current_file, line, column)
+        
+        if isinstance(target, IndexExpression):
+            container = self.evaluate_expression(target.object, env)
+            if isinstance(container, range):
+                container = self.range_to_array(target.object, container, env, "assigned to")
+            key = self.evaluate_expression(target.index, env)
+        else:
+            # Member target: walk the dotted object path through nested dictionaries
+            path = target.object.split('.')
+            container = env.get(path[0])
+            for name in path[1:]:
+                if not isinstance(container, dict) or name not in container:
+                    raise VanctionUndefinedError(f"{target.object}", "property")
+                container = container[name]
+            key = target.property
+            if isinstance(container, Record):
+                raise VanctionImmutableError(f"{target.object}.{key}", self.current_file, line, column)
+            if not isinstance(container, dict):
+                raise VanctionRuntimeError(f"Cannot assign property '{key}' on {type_name(container)}",
+                                           self.current_file, line, column)
+        
+        if isinstance(container, Bytes) and not container.writable:
+            raise VanctionRuntimeError("Cannot assign to an element of bytes; use ByteBuffer.create for a writable copy",
+                                       self.current_file, line, column)
+        if isinstance(container, (list, ArrayView, NumArray, deque, BitSet, Bytes)):
+            if not isinstance(key, int) or isinstance(key, bool):
+                raise VanctionTypeError("integer", type_name(key), self.current_file, line, column)
+            if not 0 <= key < len(container):
+                raise VanctionIndexOutOfRangeError(key, len(container), self.current_file, line, column)
+            if isinstance(container, list) and _LIVE_VIEWS:
+                release_views(container)
+        elif isinstance(container, (dict, SortedMap)):
+            # Ensure key is hashable type
+            if not isinstance(key, DICT_KEY_TYPES):
+                raise VanctionRuntimeError(f"Dictionary key must be a hashable type, got {type(key).__name__}",
+                                           self.current_file, line, column)
+        elif isinstance(container, (PVector, PMap)):
+            update = "PVector.with" if isinstance(container, PVector) else "PMap.assoc"
+            raise VanctionRuntimeError(f"Cannot assign to an element of {type_name(container)}; "
+                                       f"use {update} to make an updated copy", self.current_file, line, column)
+        else:
+            raise VanctionRuntimeError(f"Cannot assign to an element of {type_name(container)}",
+                                       self.current_file, line, column)
+        return container, key
+    
+    def range_to_array(self, place: Expression, value: range, env: Environment, action: str) -> list:
+        """Turn a range that is about to be changed in place into an array
+        
+        A range held in a variable is replaced there by the array, so the change is kept; a
+        temporary range simply becomes a new array. A range stored inside another container
+        cannot be replaced safely and is reported instead.
+        """
+        line, column = getattr(place, 'line', 0), getattr(place, 'column', 0)
+        if isinstance(place, Identifier):
+            owner = env.resolve(place.name)
+            if owner is not None and place.name in owner.constants:
+                raise VanctionImmutableError(place.name, self.current_file, line, column)
+            array_value = list(value)
+            if owner is not None:
+                owner.variables[place.name] = array_value
+            return array_value
+        if isinstance(place, (IndexExpression, MemberExpression, FieldExpression)):
+            raise VanctionRuntimeError(f"A range stored in a container cannot be {action} in place; "
+                                       f"store array.from(...) of it there first", self.current_file, line, column)
+        return list(value)
+    
+    def evaluate_slice(self, expr: SliceExpression, env: Environment) -> Any:
+        """Evaluate obj[start:end:step]; arrays give a view sharing storage, ranges a new range"""
+        obj = self.evaluate_expression(expr.object, env)
+        bounds = []
+        for part in (expr.start, expr.end, expr.step):
+            value = None if part is None else self.evaluate_expression(part, env)
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+                raise VanctionTypeError("integer", type_name(value), self.current_file,
+                                        getattr(expr, 'line', 0), getattr(expr, 'column', 0))
+            bounds.append(value)
+        if bounds[2] == 0:
+            raise VanctionRuntimeError("Slice step cannot be zero", self.current_file,
+                                       getattr(expr, 'line', 0), getattr(expr, 'column', 0))
+        selection = slice(*bounds)
+        
+        if isinstance(obj, list):
+            return ArrayView(obj, range(len(obj))[selection])
+        elif isinstance(obj, (ArrayView, NumArray, Rope, Bytes)):
+            return obj.slice(selection)
+        elif isinstance(obj, (str, tuple, range)):
+            # Strings and tuples are immutable, so the slice is a compact copy; ranges slice lazily
+            return obj[selection]
+        else:
+            raise VanctionRuntimeError(f"Cannot slice object of type {type_name(obj)}", self.current_file)
+    
+    def apply_binary_operator(self, expr: BinaryExpression, left: Any, right: Any) -> Any:
+        """Apply a binary operator to evaluated operands"""
+        # Check for anytion values - only for non-assignment operations
+        if expr.operator != '=' and (isinstance(left, AnytionType) or isinstance(right, AnytionType)):
+            raise VanctionAnytionError(self.current_file, getattr(expr, 'line', 0), getattr(expr, 'column', 0))
+        
+        # Check for unassigned values (None)
+        if left is None or right is None:
+            raise VanctionUnassignedError(self.current_file, getattr(expr, 'line', 0), getattr(expr, 'column', 0))
+        
+        if expr.operator == 'in':
+            # Membership: hashed for dict, set and sorted map, a scan for sequences
+            try:
+                return left in right
+            except TypeError:
+                raise VanctionRuntimeError(f"Cannot test membership of {type_name(left)} in {type_name(right)}",
+                                           self.current_file, getattr(expr, 'line', 0), getattr(expr, 'column', 0))
+        
+        # Typed numeric arrays apply the operator element-wise
+        if isinstance(left, NumArray) or isinstance(right, NumArray):
+            try:
+                return numarray_operation(expr.operator, left, right)
+            except VanctionRuntimeError as e:
+                e.file, e.line, e.column = self.current_file, getattr(expr, 'line', 0), getattr(expr, 'column', 0)
+                raise
+        
+        if expr.operator == '+':
+            return left + right
+        elif expr.operator == '-':
+            return left - right
+        elif expr.operator == '*':
+            return left * right
+        elif expr.operator == '/':
+            if right == 0:
+                raise VanctionDivisionByZeroError(self.current_file, getattr(expr, 'line', 0), getattr(expr, 'column', 0))
+            return left / right
+        elif expr.operator == '%':
+            if right == 0:
+                raise VanctionDivisionByZeroError(self.current_file, getattr(expr, 'line', 0), getattr(expr, 'column', 0))
+            return left % right
+        elif expr.operator == '^':
+            return left ** right
+        elif expr.operator == '==':
+            return left == right
+        elif expr.operator == '!=':
+            return left != right
+        elif expr.operator == '<':
+            return left < right
+        elif expr.operator == '>':
+            return left > right
+        elif expr.operator == '<=':
+            return left <= right
+        elif expr.operator == '>=':
+            return left >= right
+        elif expr.operator in BITWISE_OPERATORS:
+            try:
+                return bitwise_operation(expr.operator, left, right)
+            except VanctionRuntimeError as e:
+                e.file, e.line, e.column = self.current_file, getattr(expr, 'line', 0), getattr(expr, 'column', 0)
+                raise
+        elif expr.operator == '&&':
+            return self.is_truthy(left) and self.is_truthy(right)
+        elif expr.operator == '||':
+            return self.is_truthy(left) or self.is_truthy(right)
+        else:
+            raise VanctionRuntimeError(f"Unknown binary operator: {expr.operator}", self.current_file)
+    
+    def evaluate_comprehension(self, expr: ComprehensionExpression, env: Environment) -> Any:
+        """Build the array or dict of a comprehension in a single loop
+        
+        The comprehension variables live in one frame that is rebound per element, and
+        results go straight into the Python list or dict being built. If a lambda inside reads
+        a comprehension variable, each element gets a fresh frame instead so that the lambda
+        keeps its own element's binding.
+        """
+        frame = Environment(parent=env)
+        clauses = expr.clauses
+        clause = clauses[0]
+        fresh = getattr(expr, 'captures_variables', None)
+        if fresh is None:
+            captured = lambda_free_names(expr)
+            fresh = expr.captures_variables = any(not captured.isdisjoint(c.variables) for c in clauses)
+        
+        # Common case: [element for x in iterable (if condition)]
+        if (not fresh and expr.key is None and len(clauses) == 1 and len(clause.variables) == 1 and
+                len(clause.conditions) <= 1):
+            name = clause.variables[0]
+            element = expr.element
+            condition = clause.conditions[0] if clause.conditions else None
+            variables = frame.variables
+            evaluate = self.evaluate_expression
+            result = []
+            append = result.append
+            for item in self.iterate(evaluate(clause.iterable, env)):
+                variables[name] = AnytionType() if item is None else item
+                if condition is None or self.is_truthy(evaluate(condition, frame)):
+                    append(evaluate(element, frame))
+            return result
+        
+        result = [] if expr.key is None else {}
+        self.fill_comprehension(expr, 0, frame, result, fresh)
+        return result
+    
+    def fill_comprehension(self, expr: ComprehensionExpression, index: int, frame: Environment, result,
+                           fresh: bool = False):
+        """Run comprehension clause index and the clauses nested inside it, adding to result
+        
+        With fresh set, every element binds its variables in a new frame below frame.
+        """
+        clause = expr.clauses[index]
+        names = clause.variables
+        parent = frame
+        variables = frame.variables
+        innermost = index == len(expr.clauses) - 1
+        for item in self.iterate(self.evaluate_expression(clause.iterable, parent), len(names)):
+            if fresh:
+                frame = Environment(parent=parent)
+                variables = frame.variables
+            if len(names) == 1:
+                variables[names[0]] = AnytionType() if item is None else item
+            else:
+                for name, value in zip(names, self.unpack_loop_item(item, names)):
+                    variables[name] = AnytionType() if value is None else value
+            if clause.conditions and not all(self.is_truthy(self.evaluate_expression(condition, frame))
+                                             for condition in clause.conditions):
+                continue
+            if not innermost:
+                self.fill_comprehension(expr, index + 1, frame, result, fresh)
+            elif expr.key is None:
+                result.append(self.evaluate_expression(expr.element, frame))
+            else:
+                key = self.evaluate_expression(expr.key, frame)
+                # Ensure key is hashable type
+                if not isinstance(key, DICT_KEY_TYPES):
+                    raise VanctionRuntimeError(f"Dictionary key must be a hashable type, got {type(key).__name__}", self.current_file)
+                result[key] = self.evaluate_expression(expr.element, frame)
+    
+    def closure_scope(self, expr: LambdaExpression, env: Environment) -> Environment:
+        """The scope a lambda closes over: only the frames of env's chain that bind its free names
+        
+        The kept frames share their bindings with the originals, so names still resolve when
+        the lambda runs and later assignments are seen. A name not bound yet is looked up in
+        env itself, where a later assignment would bind it.
+        """
+        names = getattr(expr, 'free_names', None)
+        if names is None:
+            names = expr.free_names = tuple(sorted(free_names(expr)))
+        global_env = self.global_env
+        owners = set()
+        for name in names:
+            owner = env.resolve(name)
+            if owner is None and '.' not in name:
+                owner = env
+            if owner is not None and owner is not global_env:
+                owners.add(id(owner))
+        if not owners:
+            return global_env
+        
+        kept = []
+        frame = env
+        while frame is not None and frame is not global_env:
+            if id(frame) in owners:
+                kept.append(frame)
+                # The frame's function drops all other locals when it returns (see invoke_function)
+                captured = getattr(frame, 'captured_names', None)
+                if captured is None:
+                    captured = frame.captured_names = set()
+                captured.update(names)
+            frame = frame.parent
+        scope = global_env
+        for frame in reversed(kept):
+            scope = frame.share(scope)
+        return scope
+    
+    def make_lambda(self, expr: LambdaExpression, env: Environment) -> Callable:
+        """Create a closure over just the scopes that bind the lambda's free names"""
+        closure_env = self.closure_scope(expr, env)
+        
+        parameters = expr.parameters
+        parameter_types = expr.parameter_types
+        body = expr.body
+        if parameter_types and not getattr(expr, 'specialized', False):
+            specialize_numeric([body], {param for param, type_annotation in parameter_types.items()
+                                        if type_annotation in NUMERIC_TYPES})
+            expr.specialized = True
+        
+        def lambda_func(*args):
+            # Bind parameters
+            if len(args) != len(parameters):
+                raise VanctionFunctionCallError(f"Lambda function expects {len(parameters)} arguments, got {len(args)}")
+            
+            if parameter_types:
+                for param, arg in zip(parameters, args):
+                    if param in parameter_types:
+                        self.check_type(arg, parameter_types[param], f"lambda parameter '{param}'", expr)
+            
+            lambda_env = Environment(parent=closure_env)
+            for param, arg in zip(parameters, args):
+                lambda_env.define(param, arg)
+            
+            # Execute lambda body
+            return self.evaluate_expression(body, lambda_env)
+        
+        lambda_func.expression = expr
+        lambda_func.closure_env = closure_env
+        return lambda_func
+    
+    def fast_callable(self, fn: Any, name: str) -> Callable:
+        """Return a Python callable for a Vanction function value, for builtins that call it per element
+        
+        Unannotated lambdas are evaluated in one reused frame whose parameters are rebound on
+        each call, instead of building a new environment per call. A body that makes lambdas
+        (which would keep the frame) or assigns variables (which would carry over to the next
+        call) gets a new frame per call as usual.
+        """
+        if isinstance(fn, FunctionDef):
+            return lambda *args: self.execute_function(fn, list(args))
+        if not callable(fn):
+            raise VanctionTypeError(f"function for {name}", type_name(fn), self.current_file)
+        expr = getattr(fn, 'expression', None)
+        if expr is None or expr.parameter_types:
+            return fn
+        shares_frame = getattr(expr, 'shares_frame', None)
+        if shares_frame is None:
+            shares_frame = expr.shares_frame = not (contains_lambda(expr.body) or contains_assignment(expr.body))
+        if not shares_frame:
+            return fn
+        
+        parameters = expr.parameters
+        body = expr.body
+        frame = Environment(parent=fn.closure_env)
+        variables = frame.variables
+        evaluate = self.evaluate_expression
+        active = [False]
+        
+        def call(*args):
+            if active[0] or len(args) != len(parameters):
+                # Re-entered (or wrong arity): fall back to a fresh frame
+                return fn(*args)
+            active[0] = True
+            try:
+                for param, arg in zip(parameters, args):
+                    variables[param] = AnytionType() if arg is None else arg
+                return evaluate(body, frame)
+            finally:
+                active[0] = False
+        return call
+    
     def evaluate_call_expression(self, expression: CallExpression, env: Environment) -> Any:
         function_name = expression.function
         
@@ -1426,6 +5012,9 @@ class Interpreter:
                         if isinstance(kw_value, AnytionType):
                             raise VanctionAnytionError(self.current_file, getattr(arg, 'line', 0), getattr(arg, 'column', 0))
                         keyword_arguments[name] = kw_value
+                    if function_name in IN_PLACE_ARRAY_BUILTINS and arguments and isinstance(arguments[0], range):
+                        arguments[0] = self.range_to_array(expression.arguments[0], arguments[0], env,
+                                                           f"changed by {function_name}")
                     return builtin_func(*arguments, **keyword_arguments)
                 else:
                     raise VanctionUndefinedError(function_name, "function")
@@ -1462,29 +5051,62 @@ class Interpreter:
                         if isinstance(arg_value, AnytionType):
                             raise VanctionAnytionError(self.current_file, getattr(arg, 'line', 0), getattr(arg, 'column', 0))
                         arguments.append(arg_value)
-                    return builtin_func(*arguments)
+                    keyword_arguments = {}
+                    for name, arg in expression.keyword_arguments.items():
+                        kw_value = self.evaluate_expression(arg, env)
+                        # Check if keyword argument is AnytionType
+                        if isinstance(kw_value, AnytionType):
+                            raise VanctionAnytionError(self.current_file, getattr(arg, 'line', 0), getattr(arg, 'column', 0))
+                        keyword_arguments[name] = kw_value
+                    return builtin_func(*arguments, **keyword_arguments)
                 else:
                     raise VanctionUndefinedError(function_name, "function")
     
     def evaluate_format_string(self, format_string: str, env: Environment) -> str:
         """Evaluate format string with variable substitution"""
-        import re
+        parts = self.format_string_cache.get(format_string)
+        if parts is None:
+            parts = compile_format_string(format_string, self.current_file)
+            self.format_string_cache[format_string] = parts
+        return self.evaluate_format_parts(parts, env)
+    
+    def evaluate_format_parts(self, parts: list, env: Environment) -> str:
+        """Join the literal text and evaluated placeholders of a compiled format string"""
+        pieces = []
+        for part in parts:
+            if part.__class__ is str:
+                pieces.append(part)
+                continue
+            
+            expression = part.expression
+            if isinstance(expression, Identifier):
+                # Plain names are read directly so anytion values print as <anytion>
+                try:
+                    value = env.get(expression.name)
+                except VanctionUndefinedError:
+                    pieces.append('{' + part.source + '}')  # Keep original if variable not found
+                    continue
+            else:
+                value = self.evaluate_expression(expression, env)
+            
+            if part.format_spec:
+                try:
+                    pieces.append(format(value, part.format_spec))
+                except (ValueError, TypeError):
+                    raise VanctionRuntimeError(f"Invalid format specifier '{part.format_spec}' for {type_name(value)} value",
+                                               self.current_file, getattr(expression, 'line', 0), getattr(expression, 'column', 0))
+            else:
+                pieces.append(to_text(value))
+        return ''.join(pieces)
+    
+    def shadows_builtin(self, name: str, env: Environment) -> bool:
+        """Check whether assigning name in env should create a local instead of replacing a builtin
         
-        # Replace {{var}} patterns with actual variable values
-        def replace_var(match):
-            var_name = match.group(1)
-            try:
-                value = env.get(var_name)
-                # Check if value is AnytionType - if so, return a placeholder
-                if isinstance(value, AnytionType):
-                    return "<anytion>"
-                return str(value)
-            except VanctionUndefinedError:
-                return f"{{{var_name}}}"  # Keep original if variable not found
-        
-        # Replace all {{var}} patterns
-        result = re.sub(r'\{\{([^}]+)\}\}', replace_var, format_string)
-        return result
+        A global the program has assigned itself (count = 0 at top level) is updated as usual.
+        """
+        if env is self.global_env or name not in self.builtins or env.resolve(name) is not self.global_env:
+            return False
+        return self.global_env.variables.get(name, _MISSING) is self.builtins[name]
     
     def is_truthy(self, value: Any) -> bool:
         if value is None:
@@ -1493,7 +5115,7 @@ class Interpreter:
             return value
         elif isinstance(value, (int, float)):
             return value != 0
-        elif isinstance(value, str):
+        elif isinstance(value, (str, Rope)):
             return len(value) > 0
         else:
             return True
\ No newline at end of file
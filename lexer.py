@@ -10,6 +10,7 @@ class TokenType(Enum):
     ELSE = 'ELSE'
     WHILE = 'WHILE'
     RETURN = 'RETURN'
+    YIELD = 'YIELD'
     SYSTEM = 'SYSTEM'
     PRINT = 'PRINT'
     INPUT = 'INPUT'
@@ -47,6 +48,15 @@ class TokenType(Enum):
     LESS_EQUAL = 'LESS_EQUAL'
     GREATER_EQUAL = 'GREATER_EQUAL'
     
+    # Augmented assignment operators
+    PLUS_ASSIGN = 'PLUS_ASSIGN'          # +=
+    MINUS_ASSIGN = 'MINUS_ASSIGN'        # -=
+    MULTIPLY_ASSIGN = 'MULTIPLY_ASSIGN'  # *=
+    DIVIDE_ASSIGN = 'DIVIDE_ASSIGN'      # /=
+    MODULO_ASSIGN = 'MODULO_ASSIGN'      # %=
+    INCREMENT = 'INCREMENT'              # ++
+    DECREMENT = 'DECREMENT'              # --
+    
     # Logical operators
     AND = 'AND'          # &
     OR = 'OR'            # |
@@ -94,6 +104,11 @@ class TokenType(Enum):
     EOF = 'EOF'
     NEWLINE = 'NEWLINE'
 
+# Tokens that can end an operand; a '|' after one of these may be bitwise OR
+OPERAND_END_TOKENS = frozenset((TokenType.IDENTIFIER, TokenType.NUMBER, TokenType.STRING,
+                                TokenType.FORMAT_STRING, TokenType.RAW_STRING, TokenType.TRUE,
+                                TokenType.FALSE, TokenType.RPAREN, TokenType.RBRACKET))
+
 @dataclass
 class Token:
     type: TokenType
@@ -118,6 +133,7 @@ class Lexer:
             'while': TokenType.WHILE,
             'for': TokenType.FOR,
             'return': TokenType.RETURN,
+            'yield': TokenType.YIELD,
             'System': TokenType.SYSTEM,
             'print': TokenType.PRINT,
             'input': TokenType.INPUT,
@@ -165,6 +181,47 @@ class Lexer:
             '^': TokenType.POWER,
             '->': TokenType.ARROW,     # Lambda arrow
         }
+        
+        # Augmented assignment, increment and decrement operators
+        self.augmented_tokens = {
+            '+=': TokenType.PLUS_ASSIGN,
+            '-=': TokenType.MINUS_ASSIGN,
+            '*=': TokenType.MULTIPLY_ASSIGN,
+            '/=': TokenType.DIVIDE_ASSIGN,
+            '%=': TokenType.MODULO_ASSIGN,
+            '++': TokenType.INCREMENT,
+            '--': TokenType.DECREMENT,
+        }
+    
+    def is_bitwise_or(self, line: int) -> bool:
+        """Check whether the '|' at the current position is bitwise OR rather than a comment
+        
+        It is an operator only when it follows an operand on the same line and is written
+        directly against the next operand, as in 'a |b' or 'a|b'. A '|' followed by a space, a
+        tab or the end of the line always starts a comment, so 'x = 2 | note' is a comment.
+        """
+        previous = self.tokens[-1] if self.tokens else None
+        if previous is None or previous.line != line or previous.type not in OPERAND_END_TOKENS:
+            return False
+        following = self.peek_char()
+        return following.isalnum() or following in ('_', '(', '[', '"', '$', '-')
+    
+    def is_update_operator(self) -> bool:
+        """Check whether the '++' or '--' at the current position updates a variable
+        
+        It is postfix when the previous token ends an assignable operand (a name or ']') and no
+        operand follows, as in 'i++;', and prefix when no operand precedes it and a name
+        follows, as in '--i'. Anything else is two signs, so '5--3' is 5 - -3.
+        """
+        offset = 2
+        while self.peek_char(offset) in (' ', '\t'):
+            offset += 1
+        following = self.peek_char(offset)
+        previous = self.tokens[-1] if self.tokens else None
+        if previous is not None and previous.type in OPERAND_END_TOKENS:
+            starts_operand = following.isalnum() or following in ('_', '(', '[', '"', '$')
+            return previous.type in (TokenType.IDENTIFIER, TokenType.RBRACKET) and not starts_operand
+        return following.isalpha() or following == '_'
     
     def current_char(self) -> str:
         if self.position >= len(self.source):
@@ -447,6 +504,14 @@ class Lexer:
                 self.advance()
                 continue
             
+            # Handle augmented assignment, increment and decrement operators
+            two_chars = self.current_char() + self.peek_char()
+            if two_chars in self.augmented_tokens and (two_chars not in ('++', '--') or self.is_update_operator()):
+                self.tokens.append(Token(self.augmented_tokens[two_chars], two_chars, line, column))
+                self.advance()
+                self.advance()
+                continue
+            
             # Handle Lambda arrow operator
             if self.current_char() == '-' and self.peek_char() == '>':
                 self.tokens.append(Token(TokenType.ARROW, '->', line, column))
@@ -474,6 +539,12 @@ class Lexer:
                 self.advance()
                 continue
             
+            # Bitwise OR between two operands (a | b); otherwise '|' starts a comment
+            if self.current_char() == '|' and self.is_bitwise_or(line):
+                self.tokens.append(Token(TokenType.BITWISE_OR, '|', line, column))
+                self.advance()
+                continue
+            
             # Handle comments
             if self.current_char() == '|':
                 # Single line comment: | xxxx
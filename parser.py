@@ -1,8 +1,17 @@
-from typing import List, Optional, Union, Dict, Tuple
-from dataclasses import dataclass
+from typing import List, Optional, Union, Dict, Tuple, Iterator
+from dataclasses import dataclass, fields
 from lexer import Token, TokenType, Lexer
 
 # AST Node Definitions
+# Augmented assignment tokens and the arithmetic operator each one applies
+AUGMENTED_ASSIGNMENT_OPERATORS = {
+    TokenType.PLUS_ASSIGN: '+',
+    TokenType.MINUS_ASSIGN: '-',
+    TokenType.MULTIPLY_ASSIGN: '*',
+    TokenType.DIVIDE_ASSIGN: '/',
+    TokenType.MODULO_ASSIGN: '%',
+}
+
 @dataclass
 class ASTNode:
     line: int = 0
@@ -31,6 +40,10 @@ class FunctionDef(ASTNode):
     name: str = ""
     parameters: List[str] = None
     body: List['Statement'] = None
+    parameter_types: Dict[str, str] = None  # Optional annotations, e.g. func f(n: int)
+    return_type: Optional[str] = None  # Optional annotation, e.g. func f() -> int
+    memo: bool = False  # Declared with memo func: results are cached per argument tuple
+    generator: bool = False  # Body contains yield: calls return a lazy generator
     
     def __post_init__(self):
         super().__post_init__()
@@ -38,6 +51,8 @@ class FunctionDef(ASTNode):
             self.parameters = []
         if self.body is None:
             self.body = []
+        if self.parameter_types is None:
+            self.parameter_types = {}
 
 @dataclass
 class Statement(ASTNode):
@@ -56,6 +71,10 @@ class ExpressionStatement(Statement):
 class ReturnStatement(Statement):
     value: Optional['Expression'] = None
 
+@dataclass
+class YieldStatement(Statement):
+    value: Optional['Expression'] = None
+
 @dataclass
 class IfStatement(Statement):
     condition: 'Expression' = None
@@ -79,6 +98,19 @@ class WhileStatement(Statement):
         if self.body is None:
             self.body = []
 
+@dataclass
+class RecordDef(Statement):
+    name: str = ""
+    fields: List[str] = None
+    field_types: Dict[str, str] = None  # Optional annotations, e.g. record Point(x: int, y: int)
+    
+    def __post_init__(self):
+        super().__post_init__()
+        if self.fields is None:
+            self.fields = []
+        if self.field_types is None:
+            self.field_types = {}
+
 @dataclass
 class ImportStatement(Statement):
     module_name: str = ""  # Module name
@@ -96,6 +128,7 @@ class ContinueStatement(Statement):
 @dataclass
 class ForStatement(Statement):
     variable: Optional[str] = None  # For for (item in collection)
+    variables: Optional[List[str]] = None  # For for (key, value in collection)
     iterable: Optional['Expression'] = None  # For for (item in collection)
     init: Optional['Expression'] = None  # For traditional for loop
     condition: Optional['Expression'] = None  # For traditional for loop
@@ -117,6 +150,11 @@ class BinaryExpression(Expression):
     operator: str = ""
     right: 'Expression' = None
     
+    # Declared type of an annotated assignment (name: type = value)
+    type_annotation = None
+    # Operator implementation chosen by the interpreter when both operands are proven numeric
+    fast_op = None
+    
     def __post_init__(self):
         super().__post_init__()
         if self.left is None:
@@ -176,6 +214,22 @@ class Literal(Expression):
         if self.value is None:
             self.value = 0
 
+@dataclass
+class FormatField(ASTNode):
+    expression: 'Expression' = None
+    format_spec: str = ""  # Text after the top-level colon, e.g. ".3f" in {x:.3f}
+    source: str = ""  # Original placeholder text
+
+@dataclass
+class FormatStringExpression(Expression):
+    template: str = ""
+    parts: List[Union[str, FormatField]] = None  # Literal text and compiled placeholders
+    
+    def __post_init__(self):
+        super().__post_init__()
+        if self.parts is None:
+            self.parts = []
+
 @dataclass
 class ArrayExpression(Expression):
     elements: List['Expression'] = None
@@ -194,6 +248,30 @@ class DictExpression(Expression):
         if self.entries is None:
             self.entries = []
 
+@dataclass
+class ComprehensionClause(ASTNode):
+    variables: List[str] = None  # for x in ... / for k, v in ...
+    iterable: 'Expression' = None
+    conditions: List['Expression'] = None  # Trailing if filters
+    
+    def __post_init__(self):
+        super().__post_init__()
+        if self.conditions is None:
+            self.conditions = []
+
+@dataclass
+class ComprehensionExpression(Expression):
+    element: 'Expression' = None  # Array element, or dict value
+    key: Optional['Expression'] = None  # Set for dict comprehensions
+    clauses: List[ComprehensionClause] = None
+
+@dataclass
+class AugmentedAssignment(Expression):
+    target: 'Expression' = None  # Identifier, IndexExpression or MemberExpression
+    operator: str = ""  # Arithmetic operator applied: x += 1 has operator '+'
+    value: 'Expression' = None
+    postfix: bool = False  # x++ / x-- evaluate to the value before the update
+
 @dataclass
 class TupleExpression(Expression):
     elements: List['Expression'] = None
@@ -228,11 +306,14 @@ class ThrowStatement(Statement):
 class LambdaExpression(Expression):
     parameters: List[str] = None
     body: 'Expression' = None
+    parameter_types: Dict[str, str] = None  # Optional annotations, e.g. lambda x: int -> x * 2
     
     def __post_init__(self):
         super().__post_init__()
         if self.parameters is None:
             self.parameters = []
+        if self.parameter_types is None:
+            self.parameter_types = {}
 
 @dataclass
 class IndexExpression(Expression):
@@ -246,6 +327,18 @@ class IndexExpression(Expression):
         if self.index is None:
             self.index = None
 
+@dataclass
+class SliceExpression(Expression):
+    object: 'Expression' = None
+    start: Optional['Expression'] = None  # a[start:end:step], each part optional
+    end: Optional['Expression'] = None
+    step: Optional['Expression'] = None
+
+@dataclass
+class FieldExpression(Expression):
+    object: 'Expression' = None  # Field access on a computed value, e.g. points[0].x
+    property: str = ""
+
 @dataclass
 class SwitchStatement(Statement):
     expression: 'Expression' = None
@@ -269,12 +362,136 @@ class CaseStatement(ASTNode):
         if self.body is None:
             self.body = []
 
+def iter_child_nodes(node: ASTNode) -> Iterator[ASTNode]:
+    """Yield the direct child nodes of an AST node"""
+    for field in fields(node):
+        yield from _iter_nodes(getattr(node, field.name))
+
+def contains_yield(nodes) -> bool:
+    """Check whether statements contain a yield, not counting nested function definitions"""
+    for node in nodes:
+        if isinstance(node, YieldStatement):
+            return True
+        if isinstance(node, (Statement, CaseStatement)) and not isinstance(node, FunctionDef):
+            if contains_yield(iter_child_nodes(node)):
+                return True
+    return False
+
+def ast_fingerprint(node) -> str:
+    """Return a position-independent text form of an AST, used to detect source changes"""
+    if isinstance(node, ASTNode):
+        parts = [f"{field.name}={ast_fingerprint(getattr(node, field.name))}"
+                 for field in fields(node) if field.name not in ('line', 'column')]
+        return f"{type(node).__name__}({', '.join(parts)})"
+    if isinstance(node, (list, tuple)):
+        return '[' + ', '.join(ast_fingerprint(item) for item in node) + ']'
+    if isinstance(node, dict):
+        return '{' + ', '.join(f"{key!r}: {ast_fingerprint(value)}" for key, value in node.items()) + '}'
+    return repr(node)
+
+def _iter_nodes(value) -> Iterator[ASTNode]:
+    if isinstance(value, ASTNode):
+        yield value
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_nodes(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_nodes(item)
+
+def compile_format_string(template: str, filename: str = "<file>", line: int = 0,
+                          column: int = 0) -> List[Union[str, FormatField]]:
+    """Split a lexed format string into literal text and parsed placeholder expressions
+    
+    The lexer stores each {placeholder} as {{placeholder}}. A placeholder may hold any
+    expression followed by an optional format spec ({x:.3f}, {n:>8}); text that does not
+    parse as an expression is kept literally. line and column give the position of the
+    f-string token, so that errors point into the source rather than into the placeholder.
+    """
+    parts = []
+    literal = ''
+    position = 0
+    while position < len(template):
+        start = template.find('{{', position)
+        end = template.find('}}', start + 2) if start != -1 else -1
+        if start == -1 or end == -1:
+            literal += template[position:]
+            break
+        literal += template[position:start]
+        source = template[start + 2:end]
+        position = end + 2
+        
+        field = _compile_format_field(source, filename)
+        if field is None:
+            literal += '{' + source + '}'
+            continue
+        if line:
+            # Source position of the placeholder: after f" and the '{', where each earlier
+            # placeholder is two characters shorter than its {{...}} form in the template
+            before = template[:start]
+            field_line = line + before.count('\n')
+            if '\n' in before:
+                field_column = len(before) - before.rindex('\n')
+            else:
+                field_column = column + 2 + len(before) - before.count('{{') - before.count('}}') + 1
+            _shift_positions(field.expression, field_line, field_column)
+        if literal:
+            parts.append(literal)
+            literal = ''
+        parts.append(field)
+    if literal:
+        parts.append(literal)
+    return parts
+
+def _shift_positions(node: ASTNode, line: int, column: int):
+    """Move positions lexed relative to a placeholder (line 1, column 1) to the placeholder's place"""
+    if node.line == 1:
+        node.column += column - 1
+    if node.line:
+        node.line += line - 1
+    for child in iter_child_nodes(node):
+        _shift_positions(child, line, column)
+
+def _compile_format_field(source: str, filename: str) -> Optional[FormatField]:
+    # The format spec starts at the first colon outside brackets and string literals
+    depth = 0
+    quote = None
+    split = len(source)
+    for index, char in enumerate(source):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth -= 1
+        elif char == ':' and depth == 0:
+            split = index
+            break
+    expression_source = source[:split].strip()
+    format_spec = source[split + 1:] if split < len(source) else ""
+    if not expression_source:
+        return None
+    
+    try:
+        tokens = [token for token in Lexer(expression_source).tokenize() if token.type != TokenType.NEWLINE]
+        parser = Parser(tokens, filename, report_errors=False)
+        expression = parser.parse_expression()
+        if parser.current_token is None or parser.current_token.type != TokenType.EOF:
+            return None
+    except (SyntaxError, AttributeError, IndexError, ValueError):
+        return None
+    return FormatField(expression=expression, format_spec=format_spec, source=source.strip())
+
 class Parser:
-    def __init__(self, tokens: List[Token], filename: str = "<file>"):
+    def __init__(self, tokens: List[Token], filename: str = "<file>", report_errors: bool = True):
         self.tokens = tokens
         self.position = 0
         self.current_token = self.tokens[0] if tokens else None
         self.filename = filename
+        self.report_errors = report_errors  # Print diagnostics before raising SyntaxError
     
     def peek_token(self, offset: int = 1) -> Optional[Token]:
         pos = self.position + offset
@@ -334,6 +551,9 @@ class Parser:
             # Generate error message with file info
             error_msg = f"Syntax Error: {expected_desc} expected, found {actual_desc}"
             
+            if not self.report_errors:
+                raise SyntaxError(error_msg)
+            
             # Print error with file location and pointer
             print(f"Error: {error_msg}")
             print(f"  --> {filename}:{line}:{column}")
@@ -374,6 +594,8 @@ class Parser:
             self.skip_newlines()
             if self.current_token and self.current_token.type == TokenType.FUNC:
                 functions.append(self.parse_function())
+            elif self.is_memo_function():
+                functions.append(self.parse_memo_function())
             elif self.current_token and self.current_token.type == TokenType.IMPORT:
                 # Collect top-level import statements
                 top_level_statements.append(self.parse_import_statement())
@@ -399,15 +621,23 @@ class Parser:
         
         self.consume_with_filename(TokenType.LPAREN)
         parameters = []
+        parameter_types = {}
         
         if self.current_token and self.current_token.type == TokenType.IDENTIFIER:
-            parameters.append(self.consume_with_filename(TokenType.IDENTIFIER).value)
+            parameters.append(self.parse_parameter(parameter_types))
             
             while self.current_token and self.current_token.type == TokenType.COMMA:
                 self.advance()
-                parameters.append(self.consume_with_filename(TokenType.IDENTIFIER).value)
+                parameters.append(self.parse_parameter(parameter_types))
         
         self.consume_with_filename(TokenType.RPAREN)
+        
+        # Optional return type annotation: func f(n: int) -> int { ... }
+        return_type = None
+        if self.current_token and self.current_token.type == TokenType.ARROW:
+            self.advance()
+            return_type = self.consume_with_filename(TokenType.IDENTIFIER).value
+        
         self.consume_with_filename(TokenType.LBRACE)
         
         body = self.parse_statements()
@@ -415,12 +645,67 @@ class Parser:
         self.consume_with_filename(TokenType.RBRACE)
         
         # Create function with line/column info
-        func_def = FunctionDef(name=name, parameters=parameters, body=body)
+        func_def = FunctionDef(name=name, parameters=parameters, body=body,
+                               parameter_types=parameter_types, return_type=return_type,
+                               generator=contains_yield(body))
         func_def.line = func_token.line
         func_def.column = func_token.column
         
         return func_def
     
+    def is_memo_function(self) -> bool:
+        """Check for the memo modifier: memo func name(...) { ... }"""
+        return (self.current_token is not None and
+                self.current_token.type == TokenType.IDENTIFIER and self.current_token.value == 'memo' and
+                self.peek_token() is not None and self.peek_token().type == TokenType.FUNC)
+    
+    def parse_memo_function(self) -> FunctionDef:
+        self.advance()  # Consume 'memo'
+        func_def = self.parse_function()
+        if func_def.generator:
+            raise SyntaxError(f"Generator function '{func_def.name}' cannot be memo at line {func_def.line}")
+        func_def.memo = True
+        return func_def
+    
+    def is_record_definition(self) -> bool:
+        """Check for a record declaration: record Name(field, ...)"""
+        return (self.current_token is not None and
+                self.current_token.type == TokenType.IDENTIFIER and self.current_token.value == 'record' and
+                self.peek_token() is not None and self.peek_token().type == TokenType.IDENTIFIER and
+                self.peek_token(2) is not None and self.peek_token(2).type == TokenType.LPAREN)
+    
+    def parse_record_definition(self) -> RecordDef:
+        start_token = self.current_token
+        self.advance()  # Consume 'record'
+        name = self.consume_with_filename(TokenType.IDENTIFIER).value
+        self.consume_with_filename(TokenType.LPAREN)
+        
+        fields = []
+        field_types = {}
+        while self.current_token and self.current_token.type != TokenType.RPAREN:
+            field = self.parse_parameter(field_types)
+            if field in fields:
+                raise SyntaxError(f"Duplicate field '{field}' in record {name} at line {start_token.line}")
+            fields.append(field)
+            if self.current_token and self.current_token.type == TokenType.COMMA:
+                self.advance()
+        self.consume_with_filename(TokenType.RPAREN)
+        if self.current_token and self.current_token.type == TokenType.SEMICOLON:
+            self.advance()
+        
+        record = RecordDef(name=name, fields=fields, field_types=field_types)
+        record.line = start_token.line
+        record.column = start_token.column
+        return record
+    
+    def parse_parameter(self, parameter_types: Dict[str, str]) -> str:
+        """Parse a parameter name with an optional type annotation (name: type)"""
+        name = self.consume_with_filename(TokenType.IDENTIFIER).value
+        if self.current_token and self.current_token.type == TokenType.COLON:
+            self.advance()  # Consume ':'
+            parameter_types[name] = self.consume_with_filename(TokenType.IDENTIFIER).value
+        return name
+    
     def parse_statements(self) -> List[Statement]:
         statements = []
         
@@ -445,8 +730,14 @@ class Parser:
         if self.current_token.type == TokenType.FUNC:
             # Support nested function definitions
             return self.parse_function()
+        elif self.is_memo_function():
+            return self.parse_memo_function()
+        elif self.is_record_definition():
+            return self.parse_record_definition()
         elif self.current_token.type == TokenType.RETURN:
             stmt = self.parse_return_statement()
+        elif self.current_token.type == TokenType.YIELD:
+            stmt = self.parse_yield_statement()
         elif self.current_token.type == TokenType.IF:
             stmt = self.parse_if_statement()
         elif self.current_token.type == TokenType.WHILE:
@@ -487,6 +778,12 @@ class Parser:
             var_name = self.current_token.value
             self.advance()
             
+            # Optional type annotation: immut name: type = value;
+            type_annotation = None
+            if self.current_token.type == TokenType.COLON:
+                self.advance()
+                type_annotation = self.consume_with_filename(TokenType.IDENTIFIER).value
+            
             if self.current_token.type != TokenType.ASSIGN:
                 raise SyntaxError(f"Expected '=' after 'immut {var_name}' at line {start_token.line if start_token else 0}")
             self.advance()
@@ -503,6 +800,8 @@ class Parser:
             left = Identifier(name=var_name)
             expr = BinaryExpression(left=left, operator='=', right=value)
             expr.is_constant = True  # Mark as constant
+            if type_annotation:
+                expr.type_annotation = type_annotation
             stmt = ExpressionStatement(expression=expr)
             stmt.line = start_token.line
             stmt.column = start_token.column
@@ -527,6 +826,28 @@ class Parser:
             # continue statement can be without semicolon (in certain contexts)
         elif self.current_token.type == TokenType.IMPORT:
             stmt = self.parse_import_statement()
+        elif (self.current_token.type == TokenType.IDENTIFIER and
+              self.peek_token() and self.peek_token().type == TokenType.COLON and
+              self.peek_token(2) and self.peek_token(2).type == TokenType.IDENTIFIER and
+              self.peek_token(3) and self.peek_token(3).type == TokenType.ASSIGN):
+            # Annotated assignment: name: type = value;
+            var_name = self.current_token.value
+            self.advance()  # Consume name
+            self.advance()  # Consume ':'
+            type_annotation = self.current_token.value
+            self.advance()  # Consume type
+            self.advance()  # Consume '='
+            value = self.parse_expression()
+            
+            if not self.current_token or self.current_token.type != TokenType.SEMICOLON:
+                raise SyntaxError(f"Expected semicolon after '{var_name}: {type_annotation} = ...' at line {start_token.line if start_token else 0}")
+            self.advance()
+            
+            expr = BinaryExpression(left=Identifier(name=var_name), operator='=', right=value)
+            expr.type_annotation = type_annotation
+            expr.line = start_token.line
+            expr.column = start_token.column
+            stmt = ExpressionStatement(expression=expr)
         elif self.current_token.type == TokenType.IDENTIFIER:
             # Check if it's function call or assignment
             stmt = self.parse_expression_statement()
@@ -560,6 +881,20 @@ class Parser:
         
         return ReturnStatement(value=value)
     
+    def parse_yield_statement(self) -> YieldStatement:
+        self.consume_with_filename(TokenType.YIELD)
+        
+        value = None
+        if self.current_token.type != TokenType.SEMICOLON and self.current_token.type != TokenType.NEWLINE:
+            value = self.parse_expression()
+        
+        if self.current_token and self.current_token.type in (TokenType.SEMICOLON, TokenType.NEWLINE):
+            self.advance()
+        else:
+            raise SyntaxError(f"Expected semicolon or newline after yield statement at line {self.current_token.line if self.current_token else 0}")
+        
+        return YieldStatement(value=value)
+    
     def parse_try_statement(self) -> TryStatement:
         self.consume_with_filename(TokenType.TRY)
         self.consume_with_filename(TokenType.LBRACE)
@@ -715,6 +1050,14 @@ class Parser:
             var_name = self.current_token.value
             self.advance()
             
+            # Collect further loop variables: for (key, value in collection)
+            variables = [var_name]
+            while (self.current_token and self.current_token.type == TokenType.COMMA and
+                   self.peek_token() and self.peek_token().type == TokenType.IDENTIFIER):
+                self.advance()  # Consume ','
+                variables.append(self.current_token.value)
+                self.advance()
+            
             if self.current_token and self.current_token.value == 'in':
                 # for (item in collection) syntax
                 self.advance()  # Consume 'in'
@@ -726,13 +1069,14 @@ class Parser:
                 
                 return ForStatement(
                     variable=var_name,
+                    variables=variables if len(variables) > 1 else None,
                     iterable=iterable,
                     body=body
                 )
             else:
                 # Traditional for loop: for (init; condition; update)
                 # Rollback and parse initialization
-                self.position -= 1  # Rollback
+                self.position -= 2 * len(variables) - 1  # Rollback
                 self.current_token = self.tokens[self.position] if self.position < len(self.tokens) else None
                 
                 # Parse initialization statement
@@ -946,6 +1290,14 @@ class Parser:
         # If not a multi-variable assignment, parse regular assignment
         left = self.parse_logical_or()
         
+        # Augmented assignment: x += value, counts[k] -= value
+        if self.current_token and self.current_token.type in AUGMENTED_ASSIGNMENT_OPERATORS:
+            operator = AUGMENTED_ASSIGNMENT_OPERATORS[self.current_token.type]
+            self.check_assignment_target(left)
+            self.advance()
+            right = self.parse_assignment()
+            return AugmentedAssignment(target=left, operator=operator, value=right)
+        
         if self.current_token and self.current_token.type == TokenType.ASSIGN:
             self.advance()
             right = self.parse_assignment()
@@ -1064,7 +1416,8 @@ class Parser:
     def parse_comparison(self) -> Expression:
         left = self.parse_term()
         
-        while self.current_token and self.current_token.type in (TokenType.LESS, TokenType.GREATER, TokenType.LESS_EQUAL, TokenType.GREATER_EQUAL):
+        while self.current_token and (self.current_token.type in (TokenType.LESS, TokenType.GREATER, TokenType.LESS_EQUAL, TokenType.GREATER_EQUAL) or
+                                     (self.current_token.type == TokenType.IDENTIFIER and self.current_token.value == 'in')):
             operator = self.current_token.value
             line = self.current_token.line if self.current_token else 0
             column = self.current_token.column if self.current_token else 0
@@ -1109,7 +1462,20 @@ class Parser:
         
         return left
     
+    def check_assignment_target(self, target: Expression):
+        """Reject update targets other than variables, elements and members"""
+        if not isinstance(target, (Identifier, IndexExpression, MemberExpression)):
+            raise SyntaxError(f"Invalid assignment target at line {self.current_token.line if self.current_token else 0}")
+    
     def parse_unary(self) -> Expression:
+        # Prefix increment/decrement: ++x evaluates to the updated value
+        if self.current_token and self.current_token.type in (TokenType.INCREMENT, TokenType.DECREMENT):
+            operator = '+' if self.current_token.type == TokenType.INCREMENT else '-'
+            self.advance()
+            target = self.parse_unary()
+            self.check_assignment_target(target)
+            return AugmentedAssignment(target=target, operator=operator, value=Literal(value=1))
+        
         if self.current_token and self.current_token.type in (TokenType.MINUS, TokenType.PLUS, TokenType.NOT):
             operator = self.current_token.value
             self.advance()
@@ -1181,20 +1547,46 @@ class Parser:
                         # Support chained calls, like System.out.print
                         expr = MemberExpression(object=f"{expr.object}.{expr.property}", property=property_name)
                     else:
-                        raise SyntaxError(f"Invalid member access")
+                        # Field of a computed value, like points[0].x or make_point().x
+                        expr = FieldExpression(object=expr, property=property_name)
                 else:
                     raise SyntaxError(f"Expected identifier after '.'")
             elif self.current_token.type == TokenType.LBRACKET:
-                # Handle subscript access, like a[0], a["key"]
+                # Handle subscript access, like a[0], a["key"], or slices like a[1:3], a[::2]
                 self.advance()  # Consume '['
-                index_expr = self.parse_expression()
-                self.consume_with_filename(TokenType.RBRACKET)
-                expr = IndexExpression(object=expr, index=index_expr)
+                index_expr = None
+                if self.current_token.type != TokenType.COLON:
+                    index_expr = self.parse_expression()
+                if self.current_token and self.current_token.type == TokenType.COLON:
+                    expr = self.parse_slice(expr, index_expr)
+                else:
+                    self.consume_with_filename(TokenType.RBRACKET)
+                    expr = IndexExpression(object=expr, index=index_expr)
+            elif self.current_token.type in (TokenType.INCREMENT, TokenType.DECREMENT):
+                # Postfix increment/decrement: x++ evaluates to the value before the update
+                operator = '+' if self.current_token.type == TokenType.INCREMENT else '-'
+                self.check_assignment_target(expr)
+                self.advance()
+                expr = AugmentedAssignment(target=expr, operator=operator, value=Literal(value=1), postfix=True)
             else:
                 break
         
         return expr
     
+    def parse_slice(self, obj: Expression, start: Optional[Expression]) -> SliceExpression:
+        """Parse the rest of a slice after its start: [start:end] or [start:end:step]"""
+        self.consume_with_filename(TokenType.COLON)
+        end = None
+        step = None
+        if self.current_token.type not in (TokenType.COLON, TokenType.RBRACKET):
+            end = self.parse_expression()
+        if self.current_token and self.current_token.type == TokenType.COLON:
+            self.advance()
+            if self.current_token.type != TokenType.RBRACKET:
+                step = self.parse_expression()
+        self.consume_with_filename(TokenType.RBRACKET)
+        return SliceExpression(object=obj, start=start, end=end, step=step)
+    
     def parse_primary(self) -> Expression:
         if self.current_token.type == TokenType.NUMBER:
             value = self.current_token.value
@@ -1210,9 +1602,11 @@ class Parser:
             return Literal(value=value)
         
         elif self.current_token.type == TokenType.FORMAT_STRING:
-            value = self.current_token.value
+            # Compile placeholders once here instead of on every evaluation
+            token = self.current_token
             self.advance()
-            return Literal(value=value, is_format_string=True)
+            return FormatStringExpression(template=token.value, parts=compile_format_string(
+                token.value, self.filename, token.line, token.column))
         
         elif self.current_token.type == TokenType.RAW_STRING:
             value = self.current_token.value
@@ -1272,17 +1666,18 @@ class Parser:
         self.consume_with_filename(TokenType.LAMBDA)
         
         parameters = []
+        parameter_types = {}
         if self.current_token and self.current_token.type == TokenType.IDENTIFIER:
-            parameters.append(self.consume_with_filename(TokenType.IDENTIFIER).value)
+            parameters.append(self.parse_parameter(parameter_types))
             
             while self.current_token and self.current_token.type == TokenType.COMMA:
                 self.advance()
-                parameters.append(self.consume_with_filename(TokenType.IDENTIFIER).value)
+                parameters.append(self.parse_parameter(parameter_types))
         
         self.consume_with_filename(TokenType.ARROW)
         body = self.parse_expression()
         
-        return LambdaExpression(parameters=parameters, body=body)
+        return LambdaExpression(parameters=parameters, body=body, parameter_types=parameter_types)
     
     def parse_array_expression(self) -> Expression:
         """Parse array expression [item1, item2, ...]"""
@@ -1293,6 +1688,12 @@ class Parser:
         if self.current_token and self.current_token.type != TokenType.RBRACKET:
             elements.append(self.parse_expression())
             
+            # Array comprehension: [element for x in iterable if condition]
+            if self.current_token and self.current_token.type == TokenType.FOR:
+                clauses = self.parse_comprehension_clauses()
+                self.consume_with_filename(TokenType.RBRACKET)
+                return ComprehensionExpression(element=elements[0], clauses=clauses)
+            
             # Parse remaining elements
             while self.current_token and self.current_token.type == TokenType.COMMA:
                 self.advance()  # Consume comma
@@ -1326,6 +1727,26 @@ class Parser:
         
         return TupleExpression(elements=elements)
     
+    def parse_comprehension_clauses(self) -> List[ComprehensionClause]:
+        """Parse one or more 'for names in iterable [if condition]...' comprehension clauses"""
+        clauses = []
+        while self.current_token and self.current_token.type == TokenType.FOR:
+            self.advance()  # Consume 'for'
+            variables = [self.consume_with_filename(TokenType.IDENTIFIER).value]
+            while self.current_token and self.current_token.type == TokenType.COMMA:
+                self.advance()
+                variables.append(self.consume_with_filename(TokenType.IDENTIFIER).value)
+            if not self.current_token or self.current_token.value != 'in':
+                raise SyntaxError(f"Expected 'in' in comprehension at line {self.current_token.line if self.current_token else 0}")
+            self.advance()  # Consume 'in'
+            
+            clause = ComprehensionClause(variables=variables, iterable=self.parse_expression())
+            while self.current_token and self.current_token.type == TokenType.IF:
+                self.advance()
+                clause.conditions.append(self.parse_expression())
+            clauses.append(clause)
+        return clauses
+    
     def parse_dict_expression(self) -> Expression:
         """Parse dictionary expression {key1: value1, key2: value2, ...}"""
         self.consume_with_filename(TokenType.LBRACE)
@@ -1341,6 +1762,13 @@ class Parser:
             value = self.parse_expression()
             entries.append((key, value))  # Store as tuple
             
+            # Dict comprehension: {key: value for k, v in iterable if condition}
+            if self.current_token and self.current_token.type == TokenType.FOR:
+                clauses = self.parse_comprehension_clauses()
+                self.skip_newlines()
+                self.consume_with_filename(TokenType.RBRACE)
+                return ComprehensionExpression(element=value, key=key, clauses=clauses)
+            
             # Parse remaining key-value pairs
             while self.current_token and self.current_token.type == TokenType.COMMA:
                 self.advance()  # Consume comma
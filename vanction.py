@@ -13,17 +13,18 @@ func main() {
 
 import sys
 import os
+import re
 import argparse
 
 # Increase integer string conversion limit to handle very large numbers
 sys.set_int_max_str_digits(0)  # 0 means unlimited
 
-from lexer import Lexer
-from parser import Parser, ExpressionStatement
-from interpreter import Interpreter, VanctionException, VanctionRuntimeError
+from lexer import Lexer, TokenType
+from parser import Parser, Program, ExpressionStatement
+from interpreter import Interpreter, VanctionException, VanctionRuntimeError, DEFAULT_OUTPUT_BUFFER_SIZE
 
-def run_file(filename: str):
-    """Run Vanction source file"""
+def run_file(filename: str, output_buffer_size: int = 0):
+    """Run Vanction source file (output_buffer_size > 0 buffers System.print output)"""
     try:
         with open(filename, 'r', encoding='utf-8') as f:
             code = f.read()
@@ -37,8 +38,12 @@ def run_file(filename: str):
         ast = parser.parse()
         
         # Interpret and execute
-        interpreter = Interpreter()
-        interpreter.interpret(ast, filename)  # Pass filename parameter
+        interpreter = Interpreter(output_buffer_size)
+        try:
+            interpreter.interpret(ast, filename)  # Pass filename parameter
+        finally:
+            # Buffered output is written before any error report and on exit
+            interpreter.output.flush()
         
     except FileNotFoundError:
         print(f"Error: File '{filename}' not found")
@@ -57,6 +62,78 @@ def run_file(filename: str):
         print(f"Runtime Error: {e}")
         sys.exit(1)
 
+OPENING_TOKENS = frozenset((TokenType.LPAREN, TokenType.LBRACE, TokenType.LBRACKET))
+CLOSING_TOKENS = frozenset((TokenType.RPAREN, TokenType.RBRACE, TokenType.RBRACKET))
+
+# A trailing single-line comment: a '|' not directly followed by an operand (bitwise OR)
+# or by the \ or * of a block comment
+TRAILING_COMMENT = re.compile(r'\|(?![\\*\w(\["$-]).*$')
+
+def is_complete(code: str) -> bool:
+    """Check whether code holds only complete statements: balanced brackets, ending in ; or }"""
+    try:
+        tokens = Lexer(code).tokenize()
+    except SyntaxError:
+        return False
+    depth = 0
+    last = None
+    for token in tokens:
+        if token.type in OPENING_TOKENS:
+            depth += 1
+        elif token.type in CLOSING_TOKENS:
+            depth -= 1
+        if token.type not in (TokenType.NEWLINE, TokenType.EOF):
+            last = token.type
+    return depth == 0 and last in (TokenType.SEMICOLON, TokenType.RBRACE)
+
+def statement_chunks(lines):
+    """Group source lines into (first line number, code) chunks that each end with a complete top-level statement
+    
+    A chunk is yielded as soon as its last line arrives. A rough bracket count per line decides
+    when the buffered code is worth lexing, and lexing decides whether it is complete.
+    """
+    buffer = []
+    first_line = 1
+    depth = 0
+    for number, line in enumerate(lines, 1):
+        buffer.append(line)
+        depth += sum(line.count(c) for c in '([{') - sum(line.count(c) for c in ')]}')
+        if depth > 0 or not TRAILING_COMMENT.sub('', line.strip()).rstrip().endswith((';', '}')):
+            continue
+        if is_complete(''.join(buffer)):
+            yield first_line, ''.join(buffer)
+            buffer, first_line, depth = [], number + 1, 0
+    if ''.join(buffer).strip():
+        yield first_line, ''.join(buffer)
+
+def run_piped(interpreter: Interpreter):
+    """Run a script piped into stdin, executing each top-level statement as soon as it has been read
+    
+    Functions are registered as they arrive. If the script has no top-level statements, main
+    (or the first parameterless function) runs once the input ends.
+    """
+    functions = []
+    executed = False
+    for first_line, code in statement_chunks(sys.stdin):
+        try:
+            lexer = Lexer(code)
+            lexer.line = first_line
+            program = Parser(lexer.tokenize(), "<stdin>").parse()
+        except SyntaxError as e:
+            print(f"Syntax error: {e}")
+            return
+        
+        for func in program.functions:
+            interpreter.global_env.define_function(func.name, func)
+            functions.append(func)
+        if program.top_level_statements:
+            executed = True
+            if not interpreter.interpret_repl(Program(functions=[], top_level_statements=program.top_level_statements)):
+                return
+    
+    if not executed and functions:
+        interpreter.interpret_repl(Program(functions=functions, top_level_statements=[]))
+
 def run_repl():
     """Run interactive interpreter"""
     print("Vanction Programming Language REPL v1.0")
@@ -69,32 +146,13 @@ def run_repl():
     while True:
         try:
             # Check for input from pipe
-            import sys
             if not sys.stdin.isatty():
-                # If there's pipe input, read all content at once
+                # Piped input is run statement by statement as it arrives
                 try:
-                    full_code = sys.stdin.read().strip()
-                    if not full_code:
-                        break
-                    
-                    # Lexical analysis
-                    lexer = Lexer(full_code)
-                    tokens = lexer.tokenize()
-                    
-                    # Syntax analysis
-                    parser = Parser(tokens, "<stdin>")
-                    ast = parser.parse()
-                    
-                    # Use REPL mode to interpret and execute
-                    interpreter.interpret_repl(ast)
-                    break
-                    
-                except SyntaxError as e:
-                    print(f"Syntax error: {e}")
-                    break
+                    run_piped(interpreter)
                 except Exception as e:
                     print(f"Runtime error: {e}")
-                    break
+                break
             
             # Normal interactive input
             line = input("vanction> ").strip()
@@ -151,6 +209,9 @@ def main():
     parser = argparse.ArgumentParser(description='Vanction Programming Language Interpreter')
     parser.add_argument('file', nargs='?', help='Vanction source file')
     parser.add_argument('--repl', action='store_true', help='Run interactive interpreter')
+    parser.add_argument('--buffered-output', action='store_true', help='Buffer program output and write it in blocks')
+    parser.add_argument('--output-buffer-size', type=int, default=DEFAULT_OUTPUT_BUFFER_SIZE, metavar='CHARS',
+                        help=f'Characters collected before buffered output is written (default {DEFAULT_OUTPUT_BUFFER_SIZE})')
     
     args = parser.parse_args()
     
@@ -164,7 +225,7 @@ def main():
         else:
             # If absolute path, use directly
             file = args.file
-        run_file(file)
+        run_file(file, args.output_buffer_size if args.buffered_output else 0)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file